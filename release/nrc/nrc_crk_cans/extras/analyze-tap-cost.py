@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# Copyright © 2020 Eddie Antonio Santos <Eddie.Santos@nrc-cnrc.gc.ca>
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Reports how many taps it takes to type a syllabics corpus on the touch
+layout, and which characters cost the most.
+"""
+
+import argparse
+import json
+import sys
+
+from libkeyboard.ioutils import open_input, setup_output
+from libkeyboard.tap_cost import analyze, count_words, minimal_tap_sequences
+from libkeyboard.transliteration import read_text_chunks
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("corpus", nargs="?", help="syllabics text (default: stdin)")
+parser.add_argument(
+    "--layout",
+    default="../source/nrc_crk_cans.keyman-touch-layout",
+    help="the generated touch layout (default: %(default)s)",
+)
+parser.add_argument(
+    "--word-frequencies",
+    action="store_true",
+    help="the corpus is a TSV of words and their frequencies, not running text",
+)
+parser.add_argument(
+    "--top", type=int, default=20, help="how many characters to list (default: 20)"
+)
+
+
+def main():
+    args = parser.parse_args()
+
+    with open(args.layout, encoding="UTF-8") as layout_file:
+        sequences = minimal_tap_sequences(json.load(layout_file))
+
+    with open_input(args.corpus) as corpus:
+        chunks = read_text_chunks(corpus)
+        if args.word_frequencies:
+            word_frequencies = {}
+            for line in "".join(chunks).splitlines():
+                word, _tab, frequency = line.partition("\t")
+                if frequency.strip().isdigit():
+                    word_frequencies[word] = int(frequency)
+        else:
+            word_frequencies = count_words(chunks)
+
+    setup_output(None)
+    report = analyze(word_frequencies, sequences)
+
+    characters = report.total_characters
+    print(f"words:             {report.word_count:,}")
+    print(f"characters:        {characters:,}")
+    print(f"taps (with space): {report.total_taps:,}")
+    if characters:
+        taps_per_character = sum(report.taps_by_character.values()) / characters
+        print(f"taps/character:    {taps_per_character:.3f}")
+    if report.word_count:
+        print(f"taps/word:         {report.total_taps / report.word_count:.3f}")
+    print()
+
+    print(f"Most expensive characters (top {args.top}):")
+    print("char\ttotal taps\tcount\ttaps each\tsequence")
+    for char, taps in report.most_expensive(args.top):
+        sequence = sequences[char]
+        keys = " ".join(str(tap) for tap in sequence)
+        count = report.character_counts[char]
+        print(f"{char}\t{taps}\t{count}\t{taps // count}\t{keys}")
+
+    if report.untypeable:
+        print()
+        print("Characters that cannot be typed:", file=sys.stderr)
+        for char, count in sorted(report.untypeable.items(), key=lambda item: -item[1]):
+            print(f"  U+{ord(char):04X} {char!r}\t{count}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# Copyright © 2020 Eddie Antonio Santos <Eddie.Santos@nrc-cnrc.gc.ca>
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Times the keyboard generation library.
+
+Every benchmark is run for several rounds; each round calls it enough times
+to take at least --min-time seconds. The median time per call is compared
+against a saved baseline, and any benchmark that got slower by more than
+--threshold is reported as a regression (with a non-zero exit status).
+"""
+
+import argparse
+import io
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple
+
+from libkeyboard.kmn import generate_kmn
+from libkeyboard.touch_layout import (
+    LAYOUT,
+    create_keyman_touch_layout_json,
+    parse_ascii_layout,
+)
+from libkeyboard.touch_layout_writer import write_touch_layout
+
+here = Path(__file__).parent
+
+DEFAULT_BASELINE = here / "benchmark-baseline.json"
+
+
+class Result(NamedTuple):
+    """
+    Seconds per call in each round of a benchmark.
+    """
+
+    name: str
+    times: List[float]
+
+    @property
+    def best(self) -> float:
+        return min(self.times)
+
+    @property
+    def median(self) -> float:
+        return statistics.median(self.times)
+
+    @property
+    def spread(self) -> float:
+        """
+        The interquartile range, relative to the median.
+        """
+        times = sorted(self.times)
+        count = len(times)
+        return (times[(3 * count) // 4] - times[count // 4]) / self.median
+
+
+def time_import() -> float:
+    """
+    Imports libkeyboard.syllabics in a fresh interpreter, returning how long
+    the import alone took.
+    """
+    code = (
+        "import time; start = time.perf_counter(); import libkeyboard.syllabics; "
+        "print(time.perf_counter() - start)"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=here, check=True, capture_output=True
+    ).stdout
+    return float(output)
+
+
+def benchmarks() -> Dict[str, Callable[[], object]]:
+    """
+    Returns the functions to time, by name.
+    """
+    create_layout = create_keyman_touch_layout_json
+    keyboard = parse_ascii_layout(LAYOUT)
+    touch_layout = create_layout(keyboard, include_latin=True)
+
+    def write_layout(compact):
+        phone = touch_layout["phone"]
+        write_touch_layout(phone, phone["layer"], io.StringIO(), compact=compact)
+
+    return {
+        "parse_ascii_layout": lambda: parse_ascii_layout(LAYOUT),
+        "layout_without_latin": lambda: create_layout(keyboard, include_latin=False),
+        "layout_with_latin": lambda: create_layout(keyboard, include_latin=True),
+        "generate_kmn": lambda: generate_kmn(vowel_hack=True),
+        "generate_kmn_compact": lambda: generate_kmn(vowel_hack=True, compact=True),
+        "json_dumps_indented": lambda: json.dumps(
+            touch_layout, indent=2, ensure_ascii=False
+        ),
+        "write_layout_indented": lambda: write_layout(compact=False),
+        "write_layout_compact": lambda: write_layout(compact=True),
+    }
+
+
+def run(name: str, function: Callable, rounds: int, min_time: float) -> Result:
+    # Calibrate: how many calls does it take to fill min_time?
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2 if elapsed == 0 else max(2, int(min_time / elapsed) + 1)
+
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        times.append((time.perf_counter() - start) / number)
+    return Result(name, times)
+
+
+def format_seconds(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("µs", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3f} {unit}"
+    return f"{seconds / 1e-9:.1f} ns"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "names", nargs="*", help="only run benchmarks containing these names"
+    )
+    parser.add_argument(
+        "--rounds", type=int, default=7, help="rounds per benchmark (default: 7)"
+    )
+    parser.add_argument(
+        "--min-time",
+        type=float,
+        default=0.1,
+        help="minimum duration of a round, in seconds (default: 0.1)",
+    )
+    parser.add_argument(
+        "--baseline",
+        default=DEFAULT_BASELINE,
+        help="baseline results file (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--save", action="store_true", help="save these results as the baseline"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="how much slower than the baseline is a regression (default: 0.10)",
+    )
+    args = parser.parse_args()
+
+    baseline = {}
+    if Path(args.baseline).exists():
+        with open(args.baseline, encoding="UTF-8") as baseline_file:
+            baseline = json.load(baseline_file)
+
+    selected = {"import_syllabics": time_import, **benchmarks()}
+    if args.names:
+        selected = {
+            name: function
+            for name, function in selected.items()
+            if any(pattern in name for pattern in args.names)
+        }
+
+    results = []
+    regressions = []
+    print(f"{'benchmark':<24} {'median':>12} {'best':>12} {'spread':>7} {'change':>8}")
+    for name, function in selected.items():
+        if function is time_import:
+            # Each round is a whole interpreter: do not repeat within a round.
+            result = Result(name, [time_import() for _ in range(args.rounds)])
+        else:
+            result = run(name, function, args.rounds, args.min_time)
+        results.append(result)
+
+        change = ""
+        if name in baseline:
+            ratio = result.median / baseline[name]["median"] - 1
+            change = f"{ratio:+.1%}"
+            # A new baseline is being saved, so it is not a regression:
+            if ratio > args.threshold and not args.save:
+                regressions.append(name)
+                change += " !"
+        print(
+            f"{name:<24} {format_seconds(result.median):>12} "
+            f"{format_seconds(result.best):>12} {result.spread:>7.1%} {change:>8}"
+        )
+
+    if args.save:
+        # Benchmarks that were not selected keep their old baseline:
+        for result in results:
+            baseline[result.name] = {"median": result.median, "best": result.best}
+        with open(args.baseline, "w", encoding="UTF-8") as baseline_file:
+            json.dump(baseline, baseline_file, indent=2)
+            baseline_file.write("\n")
+        print(f"Saved baseline to {args.baseline}", file=sys.stderr)
+
+    if regressions:
+        print(
+            f"Regressions (more than {args.threshold:.0%} slower): "
+            + ", ".join(regressions),
+            file=sys.stderr,
+        )
+        sys.exit(1)
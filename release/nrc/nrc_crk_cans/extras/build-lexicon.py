@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# Copyright © 2020 Eddie Antonio Santos <Eddie.Santos@nrc-cnrc.gc.ca>
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Builds a frequency-weighted lexicon of a syllabics corpus for predictive
+text: a packed trie (--output), and/or the TSV word list that a Keyman
+wordlist lexical model is compiled from (--wordlist).
+
+With --benchmark, reports the size of the lexicon, the memory it takes once
+loaded, and how long it takes to load and to complete prefixes.
+"""
+
+import argparse
+import io
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+from libkeyboard.ioutils import open_input
+from libkeyboard.lexicon import Lexicon, count_words, word_pattern, write_wordlist
+from libkeyboard.syllabics import DEFAULT_DIALECT, DIALECTS
+from libkeyboard.transliteration import read_text_chunks
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("corpus", nargs="?", help="syllabics text (default: stdin)")
+parser.add_argument("--output", metavar="FILE", help="save the packed trie to FILE")
+parser.add_argument(
+    "--wordlist", metavar="FILE", help="write a Keyman word list (TSV) to FILE"
+)
+parser.add_argument(
+    "--word-frequencies",
+    action="store_true",
+    help="the corpus is a TSV of words and their frequencies, not running text",
+)
+parser.add_argument(
+    "--dialect",
+    choices=DIALECTS,
+    default=DEFAULT_DIALECT,
+    help="whose syllabics make up words (default: %(default)s)",
+)
+parser.add_argument(
+    "--min-count",
+    type=int,
+    default=1,
+    help="leave out words that occur fewer times (default: %(default)s)",
+)
+parser.add_argument(
+    "--benchmark",
+    action="store_true",
+    help="report memory use and completion latency on stderr",
+)
+parser.add_argument(
+    "--top", type=int, default=3, help="completions per prefix (default: 3)"
+)
+
+
+def read_word_frequencies(chunks, dialect):
+    pattern = word_pattern(dialect)
+    frequencies = {}
+    for line in "".join(chunks).splitlines():
+        word, _tab, frequency = line.partition("\t")
+        # Same normalization as running text: only whole runs of syllabics.
+        if frequency.strip().isdigit() and pattern.fullmatch(word):
+            frequencies[word] = frequencies.get(word, 0) + int(frequency)
+    return frequencies
+
+
+def report(label, value):
+    print(f"{label:<24}{value}", file=sys.stderr)
+
+
+def main():
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with open_input(args.corpus) as corpus:
+        chunks = read_text_chunks(corpus)
+        if args.word_frequencies:
+            frequencies = read_word_frequencies(chunks, args.dialect)
+        else:
+            frequencies = count_words(chunks, args.dialect)
+    frequencies = {
+        word: count for word, count in frequencies.items() if count >= args.min_count
+    }
+    counted = time.perf_counter()
+
+    lexicon = Lexicon.from_frequencies(frequencies)
+    built = time.perf_counter()
+
+    if args.output:
+        with open(args.output, "wb") as lexicon_file:
+            lexicon.save(lexicon_file)
+    if args.wordlist:
+        with open(args.wordlist, "w", encoding="UTF-8") as wordlist_file:
+            write_wordlist(wordlist_file, lexicon.items())
+
+    if args.benchmark:
+        report("words", f"{len(lexicon):,}")
+        report("trie nodes", f"{lexicon.node_count:,}")
+        report("packed size", f"{lexicon.nbytes / 1024:,.1f} KiB")
+        report("counting words", f"{counted - start:.3f} s")
+        report("building trie", f"{built - counted:.3f} s")
+
+        # What a phone pays: loading the saved trie, and the memory it takes.
+        saved = io.BytesIO()
+        lexicon.save(saved)
+        saved.seek(0)
+        tracemalloc.start()
+        load_start = time.perf_counter()
+        lexicon = Lexicon.load(saved)
+        load_time = time.perf_counter() - load_start
+        loaded_size, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        report("loading", f"{load_time * 1000:.2f} ms")
+        report("memory (loaded)", f"{loaded_size / 1024:,.1f} KiB")
+        report("memory (peak loading)", f"{peak / 1024:,.1f} KiB")
+
+        # Prefixes as they are typed: every prefix of words drawn by frequency.
+        words = list(frequencies)
+        rng = random.Random(0)
+        sample = []
+        if words:
+            sample = rng.choices(words, weights=list(frequencies.values()), k=1000)
+        prefixes = [word[:length] for word in sample for length in range(len(word))]
+        latencies = []
+        for prefix in prefixes:
+            lookup_start = time.perf_counter()
+            lexicon.complete(prefix, args.top)
+            latencies.append(time.perf_counter() - lookup_start)
+        if latencies:
+            latencies.sort()
+            for label, seconds in (
+                ("completion (mean)", statistics.mean(latencies)),
+                ("completion (p50)", latencies[len(latencies) // 2]),
+                ("completion (p99)", latencies[(99 * len(latencies)) // 100]),
+                ("completion (max)", latencies[-1]),
+            ):
+                report(label, f"{seconds * 1e6:.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# Copyright © 2020 Eddie Antonio Santos <Eddie.Santos@nrc-cnrc.gc.ca>
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Generates the .kmn and .keyman-touch-layout files for many combinations of
+options at once, writing each variant into its own directory, e.g.,
+
+    OUTDIR/without-css.with-vowel-hack.without-latin/nrc_crk_cans.kmn
+
+Timing for every variant is reported on stderr. With --validate, every
+variant is also checked with validate-keyboard.py's checks, and the exit
+status is non-zero if any variant has a problem.
+"""
+
+import argparse
+import sys
+import time
+
+from libkeyboard.build_matrix import KEYBOARD_NAME, all_variants, build_matrix
+from libkeyboard.syllabics import DEFAULT_DIALECT, DIALECTS
+from libkeyboard.validator import validate_files
+
+CHOICES = {"with": (True,), "without": (False,), "both": (False, True)}
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("outdir", help="where to write the variants")
+for option in ("css", "vowel-hack", "latin"):
+    parser.add_argument(
+        f"--{option}",
+        choices=CHOICES,
+        default="both",
+        help=f"build variants with, without, or both with and without {option} "
+        "(default: both)",
+    )
+parser.add_argument(
+    "--dialect",
+    choices=(*DIALECTS, "all"),
+    default=DEFAULT_DIALECT,
+    help="build variants for this dialect, or for all of them (default: %(default)s)",
+)
+parser.add_argument(
+    "--validate",
+    action="store_true",
+    help="check every variant for unreachable layers, untypable syllabics, etc.",
+)
+parser.add_argument(
+    "-j",
+    "--jobs",
+    type=int,
+    default=0,
+    help="how many processes to build on (default: one per CPU)",
+)
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    variants = all_variants(
+        css=CHOICES[args.css],
+        vowel_hack=CHOICES[args.vowel_hack],
+        latin=CHOICES[args.latin],
+        dialects=DIALECTS if args.dialect == "all" else (args.dialect,),
+    )
+
+    start = time.perf_counter()
+    timings = build_matrix(variants, args.outdir, jobs=args.jobs or None)
+    elapsed = time.perf_counter() - start
+
+    print("variant\tkmn (ms)\tlayout (ms)", file=sys.stderr)
+    for timing in timings:
+        print(
+            f"{timing.variant.name}\t{timing.kmn_seconds * 1000:.1f}"
+            f"\t{timing.layout_seconds * 1000:.1f}",
+            file=sys.stderr,
+        )
+    print(f"{len(timings)} variants in {elapsed:.2f} s", file=sys.stderr)
+
+    if args.validate:
+        failed = 0
+        for timing in timings:
+            directory = f"{args.outdir}/{timing.variant.name}/{KEYBOARD_NAME}"
+            problems = validate_files(
+                f"{directory}.kmn",
+                f"{directory}.keyman-touch-layout",
+                timing.variant.dialect,
+            )
+            for problem in problems:
+                print(f"{timing.variant.name}: {problem}", file=sys.stderr)
+            failed += bool(problems)
+        print(f"{failed} of {len(timings)} variants failed validation", file=sys.stderr)
+        sys.exit(1 if failed else 0)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# Copyright © 2020 Eddie Antonio Santos <Eddie.Santos@nrc-cnrc.gc.ca>
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Composes syllabics text written as finals followed by vowels (e.g., ᐠᐊ,
+ᐠᐤᐊ, or ᐠᐘ) into the syllabics the keyboard would have typed (ᑲ, ᑿ, ᑿ).
+
+Streams the input, so files of any size can be converted in bounded memory.
+Throughput is reported on stderr.
+"""
+
+import argparse
+import functools
+import sys
+import time
+
+from libkeyboard.composition import (
+    compose,
+    compose_stream,
+    decompose,
+    decompose_stream,
+)
+from libkeyboard.ioutils import open_input, setup_output
+from libkeyboard.sharding import (
+    DEFAULT_SHARD_SIZE,
+    map_shards,
+    report_throughput,
+)
+from libkeyboard.syllabics import DEFAULT_DIALECT, DIALECTS
+from libkeyboard.transliteration import read_text_chunks
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("infile", nargs="?", help="text to convert (default: stdin)")
+parser.add_argument("outfile", nargs="?", help="where to write (default: stdout)")
+parser.add_argument(
+    "--decompose",
+    action="store_true",
+    help="do the reverse: write every syllabic as its final(s) and vowel",
+)
+parser.add_argument(
+    "--dialect",
+    choices=DIALECTS,
+    default=DEFAULT_DIALECT,
+    help="whose syllabics to compose (default: %(default)s)",
+)
+parser.add_argument(
+    "--quiet", action="store_true", help="do not report throughput on stderr"
+)
+parser.add_argument(
+    "-j",
+    "--jobs",
+    type=int,
+    default=1,
+    help="split the input into shards and convert them on this many processes "
+    "(0 means one per CPU)",
+)
+parser.add_argument(
+    "--shard-size",
+    type=int,
+    default=DEFAULT_SHARD_SIZE,
+    help="approximate size of each shard in bytes (default: %(default)s)",
+)
+
+
+def main():
+    args = parser.parse_args()
+    if args.jobs != 1 and args.infile in (None, "-"):
+        parser.error("--jobs requires an input file")
+
+    convert, convert_stream = compose, compose_stream
+    if args.decompose:
+        convert, convert_stream = decompose, decompose_stream
+
+    start = time.perf_counter()
+    bytes_read = [0]
+
+    if args.jobs == 1:
+        infile = open_input(args.infile)
+        setup_output(args.outfile)
+        with infile:
+            chunks = read_text_chunks(infile, counter=bytes_read)
+            for chunk in convert_stream(chunks, args.dialect):
+                sys.stdout.write(chunk)
+    else:
+        setup_output(args.outfile)
+        for shard in map_shards(
+            args.infile,
+            functools.partial(convert, dialect=args.dialect),
+            args.jobs or None,
+            args.shard_size,
+        ):
+            sys.stdout.write(shard.value)
+            bytes_read[0] += shard.bytes_read
+            if not args.quiet:
+                report_throughput(
+                    f"shard {shard.index}: ", shard.bytes_read, shard.seconds
+                )
+
+    sys.stdout.flush()
+    if not args.quiet:
+        report_throughput("", bytes_read[0], time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
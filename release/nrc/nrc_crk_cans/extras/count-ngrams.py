@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# Copyright © 2020 Eddie Antonio Santos <Eddie.Santos@nrc-cnrc.gc.ca>
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Counts keys, syllabics, and words in a syllabics corpus.
+
+Writes PREFIX.unigrams.tsv and PREFIX.bigrams.tsv (key counts, as read by
+optimize-layout.py), PREFIX.syllabics.tsv, PREFIX.syllabic-bigrams.tsv, and
+PREFIX.words.tsv (as read by analyze-tap-cost.py --word-frequencies).
+"""
+
+import argparse
+import functools
+import sys
+import time
+
+from libkeyboard.ioutils import open_input
+from libkeyboard.ngrams import NgramCounts, count_text
+from libkeyboard.sharding import DEFAULT_SHARD_SIZE, map_shards
+from libkeyboard.transliteration import read_text_chunks
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("corpus", nargs="?", help="syllabics text (default: stdin)")
+parser.add_argument(
+    "--prefix", default="corpus", help="prefix of the output files (default: corpus)"
+)
+parser.add_argument(
+    "--sketch-width",
+    type=int,
+    help="count words in a count-min sketch of this width, using fixed memory, "
+    "instead of exactly",
+)
+parser.add_argument(
+    "--top-words",
+    type=int,
+    default=10_000,
+    help="how many words to keep in sketch mode (default: %(default)s)",
+)
+parser.add_argument(
+    "-j",
+    "--jobs",
+    type=int,
+    default=1,
+    help="split the input into shards and count them on this many processes "
+    "(0 means one per CPU)",
+)
+parser.add_argument(
+    "--shard-size",
+    type=int,
+    default=DEFAULT_SHARD_SIZE,
+    help="approximate size of each shard in bytes (default: %(default)s)",
+)
+
+
+def main():
+    args = parser.parse_args()
+    if args.jobs != 1 and args.corpus in (None, "-"):
+        parser.error("--jobs requires an input file")
+
+    start = time.perf_counter()
+    bytes_read = [0]
+
+    counts = NgramCounts(args.sketch_width, args.top_words)
+    if args.jobs == 1:
+        with open_input(args.corpus) as corpus:
+            counts.add_chunks(read_text_chunks(corpus, counter=bytes_read))
+    else:
+        count_shard = functools.partial(
+            count_text, sketch_width=args.sketch_width, top_words=args.top_words
+        )
+        for shard in map_shards(
+            args.corpus, count_shard, args.jobs or None, args.shard_size
+        ):
+            counts.merge(shard.value)
+            bytes_read[0] += shard.bytes_read
+
+    counts.write_tsv(args.prefix)
+
+    elapsed = time.perf_counter() - start
+    megabytes = bytes_read[0] / 1e6
+    print(
+        f"{megabytes:.2f} MB in {elapsed:.2f} s "
+        f"({megabytes / max(elapsed, 1e-9):.2f} MB/s)",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
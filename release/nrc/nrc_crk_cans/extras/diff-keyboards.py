@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# Copyright © 2020 Eddie Antonio Santos <Eddie.Santos@nrc-cnrc.gc.ca>
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Reports the semantic differences between two keyboards: keys that were
+added, removed, or moved, key attributes (like nextlayer) that changed, and
+rules that were added, removed, or changed.
+
+OLD and NEW are either two .kmn files, two .keyman-touch-layout files, or
+two directories (e.g., from build-matrix.py), in which case every file in
+OLD is compared with the file of the same name in NEW. With --pairwise,
+every pair of the given paths is compared, and only the number of changes
+is reported.
+
+The exit status is 1 if there are any differences, like diff(1).
+"""
+
+import argparse
+import itertools
+import os
+import sys
+import time
+
+from libkeyboard.ioutils import setup_output
+from libkeyboard.keyboard_diff import diff_files, keyboard_files
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("paths", nargs="+", metavar="OLD NEW", help="files or directories")
+parser.add_argument(
+    "--pairwise", action="store_true", help="compare every pair of the given paths"
+)
+parser.add_argument(
+    "--summary", action="store_true", help="only count the changes in each file"
+)
+
+
+def diff_paths(old: str, new: str):
+    """
+    Yields (name, changes) for every file that differs.
+    """
+    if not os.path.isdir(old):
+        changes = diff_files(old, new)
+        if changes:
+            yield new, changes
+        return
+
+    old_files, new_files = keyboard_files(old), keyboard_files(new)
+    for name in sorted(set(old_files) | set(new_files)):
+        if name not in new_files:
+            yield name, ["file removed"]
+        elif name not in old_files:
+            yield name, ["file added"]
+        else:
+            changes = diff_files(os.path.join(old, name), os.path.join(new, name))
+            if changes:
+                yield name, changes
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    if not args.pairwise and len(args.paths) != 2:
+        parser.error("expected exactly two paths (or use --pairwise)")
+    setup_output(None)
+
+    start = time.perf_counter()
+    different = False
+    pairs = itertools.combinations(args.paths, 2)
+    for old, new in pairs:
+        total = 0
+        for name, changes in diff_paths(old, new):
+            total += len(changes)
+            if args.pairwise:
+                continue
+            if args.summary:
+                print(f"{name}\t{len(changes)}")
+                continue
+            print(f"--- {name}")
+            for change in changes:
+                print(change)
+        if args.pairwise:
+            print(f"{old}\t{new}\t{total}")
+        different = different or total > 0
+    print(f"compared in {time.perf_counter() - start:.3f} s", file=sys.stderr)
+    sys.exit(1 if different else 0)
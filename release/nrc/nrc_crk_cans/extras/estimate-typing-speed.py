@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# Copyright © 2020 Eddie Antonio Santos <Eddie.Santos@nrc-cnrc.gc.ca>
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Estimates the typing speed (in words per minute) of a syllabics corpus on
+LAYOUT, and on every candidate layout given (e.g., the output of
+optimize-layout.py), using Fitts' law.
+
+Prints one line per layout: words per minute, seconds per character, and
+the name of the layout, fastest first.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from libkeyboard.ioutils import open_input, setup_output
+from libkeyboard.syllabics import DEFAULT_DIALECT, DIALECTS
+from libkeyboard.tap_cost import count_words
+from libkeyboard.touch_layout import LAYOUTS
+from libkeyboard.transliteration import read_text_chunks
+from libkeyboard.typing_speed import (
+    FITTS_INTERCEPT,
+    FITTS_SLOPE,
+    count_tap_bigrams,
+    estimate_many,
+    label_sequences,
+    read_layouts,
+)
+
+parser = argparse.ArgumentParser(
+    description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+)
+parser.add_argument("corpus", help="syllabics text (- for stdin)")
+parser.add_argument(
+    "candidates",
+    nargs="*",
+    help="files of LAYOUTs, separated by blank lines, to compare with LAYOUT",
+)
+parser.add_argument(
+    "--word-frequencies",
+    action="store_true",
+    help="the corpus is a TSV of words and their frequencies, not running text",
+)
+parser.add_argument(
+    "--dialect",
+    choices=DIALECTS,
+    default=DEFAULT_DIALECT,
+    help="which dialect's syllabics and layout to use (default: %(default)s)",
+)
+parser.add_argument(
+    "--intercept",
+    type=float,
+    default=FITTS_INTERCEPT,
+    help="Fitts' law a, in seconds (default: %(default)s)",
+)
+parser.add_argument(
+    "--slope",
+    type=float,
+    default=FITTS_SLOPE,
+    help="Fitts' law b, in seconds per bit (default: %(default)s)",
+)
+parser.add_argument("--jobs", type=int, help="worker processes (default: all CPUs)")
+
+
+def main():
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with open_input(None if args.corpus == "-" else args.corpus) as corpus:
+        chunks = read_text_chunks(corpus)
+        if args.word_frequencies:
+            word_frequencies = {}
+            for line in "".join(chunks).splitlines():
+                word, _tab, frequency = line.partition("\t")
+                if frequency.strip().isdigit():
+                    word_frequencies[word] = int(frequency)
+        else:
+            word_frequencies = count_words(chunks)
+
+    # Taps are the same on every candidate, since only their labels are moved:
+    bigrams = count_tap_bigrams(word_frequencies, label_sequences(dialect=args.dialect))
+    counted = time.perf_counter()
+
+    layouts = [("LAYOUT", LAYOUTS[args.dialect])]
+    for filename in args.candidates:
+        text = Path(filename).read_text(encoding="UTF-8")
+        layouts.extend(read_layouts(filename, text))
+
+    try:
+        estimates = estimate_many(
+            layouts, bigrams, args.dialect, args.intercept, args.slope, args.jobs
+        )
+    except ValueError as error:
+        sys.exit(f"{parser.prog}: {error}")
+    finished = time.perf_counter()
+
+    setup_output(None)
+    print("wpm\ts/char\tlayout")
+    for result in sorted(estimates, key=lambda result: -result.wpm):
+        per_character = result.seconds / result.characters if result.characters else 0
+        print(f"{result.wpm:.2f}\t{per_character:.4f}\t{result.name}")
+
+    print(
+        f"counted taps in {counted - start:.3f} s, "
+        f"estimated {len(estimates)} layouts in {finished - counted:.3f} s",
+        file=sys.stderr,
+    )
+    if bigrams.untypeable:
+        skipped = sum(bigrams.untypeable.values())
+        print(f"skipped words with {skipped:,} untypeable characters", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
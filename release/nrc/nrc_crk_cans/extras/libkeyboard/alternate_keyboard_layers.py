@@ -6,6 +6,8 @@ The keyboard layers for
 
 """
 
+from .key_spec import freeze
+
 SYLLABICS_KEY = {"id": "K_SCROLL", "text": "ᓀᐦᐃᔭᐤ", "nextlayer": "default", "sp": "1"}
 WIDE_SYLLABICS_KEY = {**SYLLABICS_KEY, "width": "150"}
 
@@ -296,3 +298,10 @@ LATIN_LAYERS = [
         ],
     },
 ]
+
+# Every layout generated in this process shares these, so they are frozen to
+# make sure that nothing modifies them.
+SYLLABICS_KEY = freeze(SYLLABICS_KEY)
+WIDE_SYLLABICS_KEY = freeze(WIDE_SYLLABICS_KEY)
+NUMERIC_LAYERS = freeze(NUMERIC_LAYERS)
+LATIN_LAYERS = freeze(LATIN_LAYERS)
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# Copyright © 2020 Eddie Antonio Santos <Eddie.Santos@nrc-cnrc.gc.ca>
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+A content-addressed cache of generated files.
+
+Each generator computes a digest over exactly what its output depends on:
+the version of the generator (GENERATOR_VERSION, bumped whenever its output
+changes for the same inputs), the syllabics it reads from syllabics.tsv,
+LAYOUT, and its options. If a file was ever generated from the same digest,
+it is copied from the cache instead of being generated again. Editing a
+comment in libkeyboard/ (or a column of syllabics.tsv that no generator
+reads) changes nothing, so the cached file is reused.
+
+Only the most recently used MAX_ENTRIES files are kept.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Iterable
+
+from .syllabics import DEFAULT_DIALECT, syllabics_for
+
+__all__ = ["BuildCache", "input_digest", "options_of"]
+
+here = Path(__file__).parent
+
+# Override where generated files are cached with this environment variable:
+CACHE_DIR_VARIABLE = "LIBKEYBOARD_BUILD_CACHE"
+DEFAULT_CACHE_DIR = here.parent / ".build-cache"
+# Bump this whenever the digest is computed differently:
+DIGEST_VERSION = 2
+# Enough for every variant of build-matrix.py, several times over:
+MAX_ENTRIES = 256
+
+
+def input_digest(
+    generator: str,
+    version: int,
+    options: Iterable[str],
+    dialect: str = DEFAULT_DIALECT,
+    **inputs: str,
+) -> str:
+    """
+    Returns a hex digest of everything a generator's output depends on.
+
+    generator names the generator (e.g., "kmn"), and version is its
+    GENERATOR_VERSION; options are its (normalized) command line options;
+    dialect selects the syllabics it reads; inputs are any other named values
+    (e.g., the LAYOUT).
+    """
+    digest = hashlib.sha256()
+
+    def update(label: str, data: bytes):
+        # Length-prefix every field, so that no two inputs hash the same.
+        digest.update(f"{label}:{len(data)}:".encode("UTF-8"))
+        digest.update(data)
+
+    update("version", str(DIGEST_VERSION).encode("UTF-8"))
+    update("generator", f"{generator} {version}".encode("UTF-8"))
+    # Only the columns the generators actually read:
+    update("syllabics", repr(tuple(syllabics_for(dialect).values())).encode("UTF-8"))
+    for name, value in sorted(inputs.items()):
+        update(f"input {name}", value.encode("UTF-8"))
+    update("options", "\0".join(options).encode("UTF-8"))
+    return digest.hexdigest()
+
+
+def options_of(args, ignore: Iterable[str] = ("outfile", "cache")) -> list:
+    """
+    Returns the parsed command line options that affect the output, as
+    strings, in a stable order.
+    """
+    return [
+        f"{name}={value!r}"
+        for name, value in sorted(vars(args).items())
+        if name not in ignore
+    ]
+
+
+class BuildCache:
+    """
+    Generated files, stored by the digest of their inputs.
+    """
+
+    def __init__(self, directory: str = None, max_entries: int = MAX_ENTRIES):
+        self.directory = Path(
+            directory or os.environ.get(CACHE_DIR_VARIABLE) or DEFAULT_CACHE_DIR
+        )
+        self.max_entries = max_entries
+
+    def path_for(self, digest: str) -> Path:
+        return self.directory / digest[:2] / digest
+
+    def restore(self, digest: str, filename: str) -> bool:
+        """
+        Copies the file generated from the given digest to filename. Returns
+        False (and does nothing) if it has never been generated.
+        """
+        if not filename:
+            return False
+        path = self.path_for(digest)
+        try:
+            shutil.copyfile(path, filename)
+        except FileNotFoundError:
+            return False
+        try:
+            # The modification time is when the entry was last used:
+            os.utime(path)
+        except OSError:
+            pass
+        return True
+
+    def store(self, digest: str, filename: str):
+        """
+        Saves a freshly generated file in the cache, and evicts the least
+        recently used files beyond max_entries.
+
+        Failing to write the cache is not an error; the file will just be
+        generated again next time.
+        """
+        if not filename:
+            return
+        path = self.path_for(digest)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file first, so that concurrent builds never
+            # see a partially written file.
+            fd, temporary = tempfile.mkstemp(dir=path.parent)
+            os.close(fd)
+            shutil.copyfile(filename, temporary)
+            os.replace(temporary, path)
+        except OSError:
+            return
+        self.prune()
+
+    def prune(self, max_entries: int = None):
+        """
+        Deletes all but the max_entries most recently used files.
+        """
+        if max_entries is None:
+            max_entries = self.max_entries
+        entries = []
+        try:
+            for subdirectory in os.scandir(self.directory):
+                if not subdirectory.is_dir():
+                    continue
+                for entry in os.scandir(subdirectory.path):
+                    # Skip other builds' temporary files (from mkstemp()).
+                    if not entry.name.startswith("tmp"):
+                        entries.append((entry.stat().st_mtime_ns, entry.path))
+        except OSError:
+            return
+        if len(entries) <= max_entries:
+            return
+        entries.sort(reverse=True)
+        for _, path in entries[max_entries:]:
+            try:
+                os.unlink(path)
+                # Fails (harmlessly) unless that was the last entry in it:
+                os.rmdir(os.path.dirname(path))
+            except OSError:
+                pass
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# Copyright © 2020 Eddie Antonio Santos <Eddie.Santos@nrc-cnrc.gc.ca>
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Builds every variant of the keyboard in one go.
+
+A variant is one combination of the generators' options. Many variants share
+an output (e.g., the .kmn file does not depend on --with-latin), so every
+distinct output is generated only once, and then written into the directory
+of every variant that needs it.
+
+The syllabics (and LAYOUT) are parsed once per worker process, rather than
+once per output. Variants can also be built for several dialects at once:
+every dialect's table is selected from the same rows of syllabics.tsv,
+which are loaded only once.
+"""
+
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+from .kmn import generate_kmn
+from .syllabics import DEFAULT_DIALECT
+from .touch_layout import create_touch_layout
+
+__all__ = ["Variant", "all_variants", "build_matrix"]
+
+KEYBOARD_NAME = "nrc_crk_cans"
+
+
+class Variant(NamedTuple):
+    """
+    One combination of options for generate-kmn.py and generate-touch-layout.py.
+    """
+
+    css: bool
+    vowel_hack: bool
+    latin: bool
+    dialect: str = DEFAULT_DIALECT
+
+    @property
+    def name(self) -> str:
+        """
+        e.g., "without-css.with-vowel-hack.without-latin", prefixed by the
+        dialect unless it is Plains Cree (e.g., "woods.without-css...").
+        """
+        options = [
+            f"{'with' if enabled else 'without'}-{option}"
+            for option, enabled in (
+                ("css", self.css),
+                ("vowel-hack", self.vowel_hack),
+                ("latin", self.latin),
+            )
+        ]
+        if self.dialect != DEFAULT_DIALECT:
+            options.insert(0, self.dialect)
+        return ".".join(options)
+
+    @property
+    def kmn_options(self) -> Tuple[bool, bool, str]:
+        return (self.css, self.vowel_hack, self.dialect)
+
+    @property
+    def layout_options(self) -> Tuple[bool, str]:
+        return (self.latin, self.dialect)
+
+
+class VariantTiming(NamedTuple):
+    """
+    How long it took to generate the outputs of a variant.
+    """
+
+    variant: Variant
+    kmn_seconds: float
+    layout_seconds: float
+
+    @property
+    def total_seconds(self) -> float:
+        return self.kmn_seconds + self.layout_seconds
+
+
+def all_variants(
+    css=(False, True),
+    vowel_hack=(False, True),
+    latin=(False, True),
+    dialects=(DEFAULT_DIALECT,),
+) -> List[Variant]:
+    """
+    Returns every combination of the given option values.
+    """
+    return [
+        Variant(*options)
+        for options in itertools.product(css, vowel_hack, latin, dialects)
+    ]
+
+
+def _generate(task: Tuple[str, tuple]) -> Tuple[str, tuple, str, float]:
+    kind, options = task
+    start = time.perf_counter()
+    if kind == "kmn":
+        css, vowel_hack, dialect = options
+        text = generate_kmn(css=css, vowel_hack=vowel_hack, dialect=dialect)
+    else:
+        latin, dialect = options
+        layout = create_touch_layout(include_latin=latin, dialect=dialect)
+        text = json.dumps(layout, indent=2, ensure_ascii=False) + "\n"
+    return kind, options, text, time.perf_counter() - start
+
+
+def build_matrix(
+    variants: Iterable[Variant], outdir: str, jobs: int = None
+) -> List[VariantTiming]:
+    """
+    Writes OUTDIR/VARIANT/nrc_crk_cans.{kmn,keyman-touch-layout} for every
+    variant, generating the distinct outputs on a pool of worker processes.
+    """
+    variants = list(variants)
+    # Every distinct output, in order:
+    tasks = list(
+        dict.fromkeys(
+            task
+            for variant in variants
+            for task in (
+                ("kmn", variant.kmn_options),
+                ("layout", variant.layout_options),
+            )
+        )
+    )
+
+    jobs = min(jobs or os.cpu_count() or 1, len(tasks)) or 1
+    if jobs == 1:
+        results = list(map(_generate, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(_generate, tasks))
+    outputs: Dict[Tuple[str, tuple], Tuple[str, float]] = {
+        (kind, options): (text, seconds) for kind, options, text, seconds in results
+    }
+
+    timings = []
+    for variant in variants:
+        kmn, kmn_seconds = outputs["kmn", variant.kmn_options]
+        layout, layout_seconds = outputs["layout", variant.layout_options]
+        directory = Path(outdir) / variant.name
+        directory.mkdir(parents=True, exist_ok=True)
+        for suffix, text in (("kmn", kmn), ("keyman-touch-layout", layout)):
+            path = directory / f"{KEYBOARD_NAME}.{suffix}"
+            with open(path, "w", encoding="UTF-8") as output_file:
+                output_file.write(text)
+        timings.append(VariantTiming(variant, kmn_seconds, layout_seconds))
+    return timings
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# Copyright © 2020 Eddie Antonio Santos <Eddie.Santos@nrc-cnrc.gc.ca>
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Composes syllabics that were written as a final followed by a vowel, like
+the .kmn rules do as they are typed:
+
+    ᐠ + ᐊ      -> ᑲ
+    ᐠ + ᐤ + ᐊ  -> ᑿ
+    ᐤ + ᐊ      -> ᐘ
+    ᐠ + ᐘ      -> ᑿ
+
+    >>> compose("ᓀᐦᐃᔭᐤᐁᐏᐣ")
+    'ᓀᐦᐃᔭᐍᐏᐣ'
+    >>> decompose("ᑿ")
+    'ᐠᐤᐊ'
+
+The tables are derived from the same orthography as generate_kmn(), so
+exactly the syllabics the keyboard composes are composed here. Every
+sequence is compiled into one regular expression (a trie, like the SRO
+tokenizer in transliteration.py) that prefers the longest match, so text is
+composed in a single pass of the regex engine. Text without any sequences
+to compose passes straight through; otherwise, the result for each
+space-separated word is memoized, since the same misspelled words recur.
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, NamedTuple
+
+from .orthography import orthography_for
+from .syllabics import DEFAULT_DIALECT
+from .text_conversion import TERMINAL, MemoizedConverter, trie_to_regex
+
+__all__ = [
+    "Composer",
+    "compose",
+    "compose_stream",
+    "composer_for",
+    "decompose",
+    "decompose_stream",
+]
+
+
+class Composer(NamedTuple):
+    """
+    The composition and decomposition tables of one dialect.
+    """
+
+    # e.g., "ᐠᐤᐊ" -> "ᑿ", and "ᐠᐘ" -> "ᑿ"
+    compositions: Dict[str, str]
+    # e.g., ord("ᑿ") -> "ᐠᐤᐊ"
+    decompositions: Dict[int, str]
+    pattern: "re.Pattern"
+    # Every proper prefix of a sequence (e.g., "ᐠ", and "ᐠᐤ"):
+    incomplete: frozenset
+
+    def compose(self, text: str) -> str:
+        return self.pattern.sub(self._composed, text)
+
+    def _composed(self, match) -> str:
+        return self.compositions[match.group()]
+
+    def decompose(self, text: str) -> str:
+        return text.translate(self.decompositions)
+
+    def unfinished_tail(self, text: str) -> int:
+        """
+        Returns how many characters at the end of the text may be the start
+        of a sequence that continues in the text after it.
+        """
+        for length in (2, 1):
+            if text[-length:] in self.incomplete:
+                return length
+        return 0
+
+
+@lru_cache(maxsize=None)
+def composer_for(dialect: str = DEFAULT_DIALECT) -> Composer:
+    orthography = orthography_for(dialect)
+    table = orthography.syllabics
+    compositions = {}
+    decompositions = {}
+    for sro, syllabic in table.items():
+        if not orthography.is_combining_syllable(sro):
+            continue
+        consonants = orthography.split_prefix(syllabic.prefix)
+        finals = "".join(table[consonant].cans for consonant in consonants)
+        vowel = table[syllabic.vowel].cans
+        compositions[finals + vowel] = syllabic.cans
+        decompositions[ord(syllabic.cans)] = finals + vowel
+        # A final followed by a w syllabic, e.g., ᐠ + ᐘ (k + wa):
+        w_syllabic = table.get("w" + syllabic.vowel)
+        if len(consonants) == 2 and w_syllabic is not None:
+            compositions[finals[0] + w_syllabic.cans] = syllabic.cans
+
+    trie = {}
+    for sequence in compositions:
+        node = trie
+        for char in sequence:
+            node = node.setdefault(char, {})
+        node[TERMINAL] = ""
+    incomplete = frozenset(
+        sequence[:length]
+        for sequence in compositions
+        for length in range(1, len(sequence))
+    )
+    return Composer(
+        compositions, decompositions, re.compile(trie_to_regex(trie)), incomplete
+    )
+
+
+@lru_cache(maxsize=None)
+def _memoized_composer(dialect: str) -> MemoizedConverter:
+    return MemoizedConverter(composer_for(dialect).compose)
+
+
+@lru_cache(maxsize=None)
+def _memoized_decomposer(dialect: str) -> MemoizedConverter:
+    return MemoizedConverter(composer_for(dialect).decompose)
+
+
+def compose(text: str, dialect: str = DEFAULT_DIALECT) -> str:
+    """
+    Replaces every final + vowel (or final + ᐤ + vowel) sequence with the
+    syllabic it stands for. Everything else is left as-is.
+    """
+    if composer_for(dialect).pattern.search(text) is None:
+        return text
+    return _memoized_composer(dialect)(text)
+
+
+def decompose(text: str, dialect: str = DEFAULT_DIALECT) -> str:
+    """
+    Replaces every syllabic that the keyboard composes with the final(s)
+    and vowel it is typed with. The inverse of compose().
+    """
+    return _memoized_decomposer(dialect)(text)
+
+
+def compose_stream(
+    chunks: Iterable[str], dialect: str = DEFAULT_DIALECT
+) -> Iterator[str]:
+    """
+    Composes an iterable of text chunks. Chunks may be split anywhere; at
+    most two characters (e.g., ᐠᐤ) are held back between chunks.
+    """
+    composer = composer_for(dialect)
+    pending = ""
+    for chunk in chunks:
+        text = pending + chunk
+        cut = len(text) - composer.unfinished_tail(text)
+        pending = text[cut:]
+        if cut:
+            yield compose(text[:cut], dialect)
+    if pending:
+        yield compose(pending, dialect)
+
+
+def decompose_stream(
+    chunks: Iterable[str], dialect: str = DEFAULT_DIALECT
+) -> Iterator[str]:
+    """
+    Decomposes an iterable of text chunks. Since decomposition is per code
+    point, chunks can be split anywhere.
+    """
+    for chunk in chunks:
+        yield decompose(chunk, dialect)
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# Copyright © 2020 Eddie Antonio Santos <Eddie.Santos@nrc-cnrc.gc.ca>
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Splits a corpus that arrives in chunks (e.g., from read_text_chunks()) into
+words, without splitting the words that straddle two chunks:
+
+    >>> list(split_words(["ᑖᓂ", "ᓯ ᑮᐢ", "ᑭᓯᑳᐤ"]))
+    [[], ['ᑖᓂᓯ'], [], ['ᑮᐢᑭᓯᑳᐤ']]
+"""
+
+import re
+from collections import Counter
+from typing import Iterable, Iterator, List
+
+__all__ = ["count_words", "split_words"]
+
+
+def split_words(
+    chunks: Iterable[str], pattern: "re.Pattern" = None
+) -> Iterator[List[str]]:
+    """
+    Yields the words of each chunk. A word is a match of pattern or, by
+    default, a run of non-whitespace characters. A word at the end of a
+    chunk might continue in the next chunk, so it is held back until then.
+    """
+    pending = ""
+    for chunk in chunks:
+        text = pending + chunk
+        if pattern is None:
+            words = text.split()
+            ends_in_word = not text[-1:].isspace()
+        else:
+            words = pattern.findall(text)
+            ends_in_word = bool(text) and pattern.match(text[-1])
+        pending = words.pop() if words and ends_in_word else ""
+        yield words
+    if pending:
+        yield [pending]
+
+
+def count_words(chunks: Iterable[str], pattern: "re.Pattern" = None) -> Counter:
+    """
+    Returns the frequency of each word (as split by split_words()).
+    """
+    frequencies = Counter()
+    for words in split_words(chunks, pattern):
+        frequencies.update(words)
+    return frequencies
@@ -7,6 +7,7 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
+import mmap
 import sys
 
 # Sentinel value lets you know if filename was not provided as arguments at
@@ -37,3 +38,25 @@ def setup_output(filename: str = _unspecified):
     else:
         # To prevent Windows from using CP1252 or something dumb:
         sys.stdout.reconfigure(encoding="UTF-8")
+
+
+def open_input(filename: str = None):
+    """
+    Opens a file for reading bytes.
+
+    Regular files are memory-mapped, so that reading large corpora in chunks
+    avoids copying through an intermediate buffer. If filename is None or
+    "-", stdin is used instead.
+    """
+
+    if filename in (None, "-"):
+        return sys.stdin.buffer
+
+    file = open(filename, "rb")
+    try:
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (ValueError, OSError):
+        # Empty files and special files (like pipes) cannot be mapped.
+        return file
+    file.close()
+    return mapping
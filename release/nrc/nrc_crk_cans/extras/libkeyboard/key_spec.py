@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# Copyright © 2020 Eddie Antonio Santos <Eddie.Santos@nrc-cnrc.gc.ca>
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Immutable descriptions of keys (and layers) in a touch layout.
+
+A KeySpec is a dict that cannot be changed once it is created, so it can be
+shared between layers, cached, and reused by every layout generated in the
+same process. Because it is still a dict, it serializes to JSON as-is.
+"""
+
+from typing import Any
+
+__all__ = ["KeySpec", "freeze"]
+
+
+def _immutable(self, *args, **kwargs):
+    raise TypeError(f"{type(self).__name__} cannot be modified")
+
+
+class KeySpec(dict):
+    """
+    An immutable, hashable dict.
+
+    Use replace() and without() to get modified copies.
+    """
+
+    __slots__ = ("_hash", "_frozen")
+
+    __setitem__ = __delitem__ = __ior__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable
+
+    def __init__(self, *args, **kwargs):
+        # Calling __init__() again would change a KeySpec after its creation:
+        if getattr(self, "_frozen", False):
+            _immutable(self)
+        super().__init__(*args, **kwargs)
+        self._frozen = True
+
+    def __hash__(self) -> int:
+        try:
+            return self._hash
+        except AttributeError:
+            # Equal dicts may have their items in a different order:
+            self._hash = hash(frozenset(self.items()))
+            return self._hash
+
+    def __reduce__(self):
+        return type(self), (dict(self),)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict.__repr__(self)})"
+
+    def replace(self, **changes) -> "KeySpec":
+        """
+        Returns a copy with the given attributes changed (or added).
+        """
+        return KeySpec({**self, **freeze(changes)})
+
+    def without(self, *attributes: str) -> "KeySpec":
+        """
+        Returns a copy without the given attributes.
+        """
+        return KeySpec(
+            {name: value for name, value in self.items() if name not in attributes}
+        )
+
+
+def freeze(value: Any) -> Any:
+    """
+    Returns an immutable copy of a JSON-like value: dicts become KeySpecs,
+    and lists become tuples.
+    """
+    if isinstance(value, KeySpec):
+        return value
+    if isinstance(value, dict):
+        return KeySpec({name: freeze(item) for name, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
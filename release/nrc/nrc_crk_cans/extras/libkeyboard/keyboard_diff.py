@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# Copyright © 2020 Eddie Antonio Santos <Eddie.Santos@nrc-cnrc.gc.ca>
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Structural diffs of touch layouts and .kmn rules.
+
+Every key, row, and layer of a touch layout is hashed, and each row's hash
+covers its keys, each layer's its rows, and so on (a Merkle tree). Two
+layouts are compared top-down: any layer or row whose hash is unchanged is
+skipped without looking inside, and only keys in changed rows are compared,
+by id (and by order, among keys with the same id). Changes are reported
+semantically: keys added, removed, or moved, and which attributes (e.g.,
+nextlayer) of a key changed.
+
+Rules are compared after parsing, so a rule written per syllabic and the
+same rule written with any() and index() are equal. A rule is identified by
+its context and key; if the output or layer() of a rule changes, it is
+reported as changed, rather than removed and added.
+"""
+
+import hashlib
+import json
+import os
+from collections import Counter
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+from .rule_engine import Rule, parse_kmn
+
+__all__ = [
+    "Change",
+    "diff_files",
+    "diff_layouts",
+    "diff_rules",
+    "keyboard_files",
+    "layout_tree",
+    "load",
+    "rule_tree",
+]
+
+
+class Change(NamedTuple):
+    """
+    One semantic difference between two keyboards.
+    """
+
+    # e.g., "key moved", "nextlayer changed", "rule added"
+    kind: str
+    # e.g., "kV", or "kV row 1 key 3"
+    where: str
+    detail: str = ""
+
+    def __str__(self) -> str:
+        detail = f": {self.detail}" if self.detail else ""
+        return f"{self.where}: {self.kind}{detail}"
+
+
+class KeyNode(NamedTuple):
+    digest: bytes
+    key: dict
+
+
+class RowNode(NamedTuple):
+    digest: bytes
+    keys: Tuple[KeyNode, ...]
+
+
+class LayerNode(NamedTuple):
+    digest: bytes
+    rows: Tuple[RowNode, ...]
+
+
+class LayoutTree(NamedTuple):
+    digest: bytes
+    # Everything except the layers, e.g., the font:
+    settings: dict
+    layers: Dict[str, LayerNode]
+
+
+class RuleTree(NamedTuple):
+    digest: bytes
+    # (context, key) -> (output, layer) for the first rule of each context:
+    rules: Dict[Tuple[Tuple[str, ...], str], Tuple[str, str]]
+
+
+def _hash(*parts: bytes) -> bytes:
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part)
+    return digest.digest()
+
+
+def _canonical(value) -> bytes:
+    return json.dumps(
+        value, sort_keys=True, ensure_ascii=False, separators=(",", ":")
+    ).encode("UTF-8")
+
+
+def layout_tree(touch_layout: dict) -> LayoutTree:
+    """
+    Hashes every key, row, and layer of the (phone) touch layout.
+    """
+    phone = touch_layout["phone"]
+    settings = {name: value for name, value in phone.items() if name != "layer"}
+    layers = {}
+    for layer in phone["layer"]:
+        rows = []
+        for row in layer["row"]:
+            keys = tuple(KeyNode(_hash(_canonical(key)), key) for key in row["key"])
+            rows.append(RowNode(_hash(*(key.digest for key in keys)), keys))
+        other = {name: value for name, value in layer.items() if name != "row"}
+        layers[layer["id"]] = LayerNode(
+            _hash(_canonical(other), *(row.digest for row in rows)), tuple(rows)
+        )
+    digest = _hash(
+        _canonical(settings),
+        *(name.encode("UTF-8") + layer.digest for name, layer in layers.items()),
+    )
+    return LayoutTree(digest, settings, layers)
+
+
+def rule_tree(rules: Iterable[Rule]) -> RuleTree:
+    """
+    Indexes rules by their context and key. Like Keyman, the first rule for
+    a given context and key wins, so the rules after it are ignored.
+    """
+    table = {}
+    for rule in rules:
+        table.setdefault((rule.context, rule.key), (rule.output, rule.layer))
+    digest = _hash(*sorted(_canonical([*item]) for item in table.items()))
+    return RuleTree(digest, table)
+
+
+def diff_layouts(old: LayoutTree, new: LayoutTree) -> List[Change]:
+    """
+    Compares two touch layouts. Keys that share an id (like the two K_HYPHEN
+    keys of the numeric layer) are told apart by their order:
+
+    >>> def layout(*texts):
+    ...     keys = [{"id": "K_HYPHEN", "text": text} for text in texts]
+    ...     return {"phone": {"layer": [{"id": "numeric", "row": [{"key": keys}]}]}}
+    >>> for change in diff_layouts(
+    ...     layout_tree(layout("_", "-")), layout_tree(layout("_", "~"))
+    ... ):
+    ...     print(change)
+    numeric row 1 key 2: text changed: K_HYPHEN (-): '-' → '~'
+    """
+    if old.digest == new.digest:
+        return []
+    changes = []
+    for name in sorted(old.settings.keys() | new.settings.keys()):
+        before, after = old.settings.get(name), new.settings.get(name)
+        if before != after:
+            changes.append(
+                Change(f"{name} changed", "phone", f"{before!r} → {after!r}")
+            )
+
+    for layer_id, layer in old.layers.items():
+        if layer_id not in new.layers:
+            changes.append(Change("layer removed", layer_id))
+        elif layer.digest != new.layers[layer_id].digest:
+            changes.extend(_diff_layer(layer_id, layer, new.layers[layer_id]))
+    for layer_id in new.layers:
+        if layer_id not in old.layers:
+            changes.append(Change("layer added", layer_id))
+    return changes
+
+
+def _diff_layer(layer_id: str, old: LayerNode, new: LayerNode) -> List[Change]:
+    # Only keys in rows that changed need to be compared:
+    old_keys, new_keys = {}, {}
+    old_ids, new_ids = Counter(), Counter()
+    for row_number in range(max(len(old.rows), len(new.rows))):
+        old_row = old.rows[row_number] if row_number < len(old.rows) else None
+        new_row = new.rows[row_number] if row_number < len(new.rows) else None
+        if old_row and new_row and old_row.digest == new_row.digest:
+            continue
+        for row, keys, ids in (
+            (old_row, old_keys, old_ids),
+            (new_row, new_keys, new_ids),
+        ):
+            for column, node in enumerate(row.keys if row else ()):
+                position = (row_number + 1, column + 1)
+                keys[_identity(node.key, position, ids)] = (position, node)
+
+    changes = []
+    for identity, (position, node) in old_keys.items():
+        where = f"{layer_id} row {position[0]} key {position[1]}"
+        if identity not in new_keys:
+            changes.append(Change("key removed", where, _describe(node.key)))
+            continue
+        new_position, new_node = new_keys[identity]
+        if new_position != position:
+            changes.append(
+                Change(
+                    "key moved",
+                    where,
+                    f"{_describe(node.key)} to row {new_position[0]} "
+                    f"key {new_position[1]}",
+                )
+            )
+        if new_node.digest != node.digest:
+            changes.extend(_diff_key(where, node.key, new_node.key))
+    for identity, (position, node) in new_keys.items():
+        if identity not in old_keys:
+            where = f"{layer_id} row {position[0]} key {position[1]}"
+            changes.append(Change("key added", where, _describe(node.key)))
+    return changes
+
+
+def _identity(key: dict, position: Tuple[int, int], occurrences: Counter):
+    """
+    Identifies a key by its id, and how many keys with the same id came
+    before it (e.g., the numeric layer has two K_HYPHEN keys).
+    """
+    key_id = key.get("id")
+    if not key_id:
+        # Blank keys have no id, so they are identified by where they are.
+        return position
+    occurrence = occurrences[key_id]
+    occurrences[key_id] += 1
+    return key_id, occurrence
+
+
+def _describe(key: dict) -> str:
+    name = key.get("id") or "blank"
+    text = key.get("text")
+    return f"{name} ({text})" if text else name
+
+
+def _diff_key(where: str, old: dict, new: dict) -> List[Change]:
+    changes = []
+    for name in sorted(old.keys() | new.keys()):
+        before, after = old.get(name), new.get(name)
+        if before != after:
+            changes.append(
+                Change(
+                    f"{name} changed",
+                    where,
+                    f"{_describe(old)}: {before!r} → {after!r}",
+                )
+            )
+    return changes
+
+
+def diff_rules(old: RuleTree, new: RuleTree) -> List[Change]:
+    if old.digest == new.digest:
+        return []
+    changes = []
+    for (context, key), result in old.rules.items():
+        where = f"{''.join(context)} + [{key}]"
+        if (context, key) not in new.rules:
+            changes.append(Change("rule removed", where, _describe_result(result)))
+        elif new.rules[context, key] != result:
+            after = new.rules[context, key]
+            changes.append(
+                Change(
+                    "rule changed",
+                    where,
+                    f"{_describe_result(result)} → {_describe_result(after)}",
+                )
+            )
+    for (context, key), result in new.rules.items():
+        if (context, key) not in old.rules:
+            where = f"{''.join(context)} + [{key}]"
+            changes.append(Change("rule added", where, _describe_result(result)))
+    return changes
+
+
+def _describe_result(result: Tuple[str, str]) -> str:
+    output, layer = result
+    return f"{output!r} layer({layer})" if layer else repr(output)
+
+
+# Trees already built, by the SHA-256 of the file they came from. Identical
+# files (common across build variants) are only ever parsed once.
+_trees: Dict[str, object] = {}
+
+
+def load(filename: str):
+    """
+    Returns the tree of a .kmn or .keyman-touch-layout file.
+    """
+    with open(filename, "rb") as tree_file:
+        data = tree_file.read()
+    kind = "kmn" if filename.endswith(".kmn") else "layout"
+    content_digest = kind + hashlib.sha256(data).hexdigest()
+    try:
+        return _trees[content_digest]
+    except KeyError:
+        pass
+    text = data.decode("UTF-8")
+    if kind == "kmn":
+        tree = rule_tree(parse_kmn(text))
+    else:
+        tree = layout_tree(json.loads(text))
+    _trees[content_digest] = tree
+    return tree
+
+
+def diff_files(old_filename: str, new_filename: str) -> List[Change]:
+    """
+    Compares two .kmn files, or two .keyman-touch-layout files.
+    """
+    old, new = load(old_filename), load(new_filename)
+    if type(old) is not type(new):
+        raise ValueError(f"cannot compare {old_filename} with {new_filename}")
+    if isinstance(old, RuleTree):
+        return diff_rules(old, new)
+    return diff_layouts(old, new)
+
+
+def keyboard_files(directory: str) -> List[str]:
+    """
+    Returns the .kmn and .keyman-touch-layout files in a directory (and its
+    subdirectories), relative to it.
+    """
+    found = []
+    for parent, _subdirectories, filenames in os.walk(directory):
+        for filename in filenames:
+            if filename.endswith((".kmn", ".keyman-touch-layout")):
+                found.append(
+                    os.path.relpath(os.path.join(parent, filename), directory)
+                )
+    return sorted(found)
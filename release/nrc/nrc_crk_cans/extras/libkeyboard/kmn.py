@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# Copyright © 2019, 2020 Eddie Antonio Santos <Eddie.Santos@nrc-cnrc.gc.ca>
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Generates the .kmn keyboard code that makes the touch layout work properly.
+
+    >>> kmn = generate_kmn(vowel_hack=True)
+    >>> kmn.splitlines()[0]
+    'c AUTOGENERATED FILE - DO NOT MODIFY!'
+
+Nothing is printed and no global state is changed: use write_kmn() to write
+the code to a stream of your choice.
+"""
+
+import functools
+import io
+from collections import defaultdict
+from typing import IO
+
+from .orthography import Orthography, orthography_for
+from .profiling import NULL_PROFILER
+from .syllabics import DEFAULT_DIALECT
+
+__all__ = ["GENERATOR_VERSION", "count_rules", "generate_kmn", "write_kmn"]
+
+# The version number:
+name = "Cree Syllabics"
+version = f"1.2.0"
+
+# Bump this whenever generate_kmn() writes something different for the same
+# options and syllabics, so that cached builds (see build_cache.py) are not
+# reused:
+GENERATOR_VERSION = 1
+
+
+def generate_kmn(
+    css: bool = False,
+    vowel_hack: bool = False,
+    compact: bool = False,
+    profiler=NULL_PROFILER,
+    dialect: str = DEFAULT_DIALECT,
+) -> str:
+    """
+    Returns the .kmn source code for the keyboard.
+
+    In compact mode, there is one syllable rule per prefix (e.g., kwV) that
+    looks up the syllabic in a store with index(), rather than one rule per
+    syllabic.
+    """
+    orthography = orthography_for(dialect)
+    table = orthography.syllabics
+    out = io.StringIO()
+    emit = functools.partial(print, file=out)
+
+    # Embedd CSS when --with-css is provided:
+    css_line = "store(&KMW_EMBEDCSS) 'nrc_crk_cans.css'" if css else ""
+
+    with profiler.phase("prefix2syllabics construction"):
+        # Map a "prefix" (consonants of a syllable) to all of its syllabics.
+        # kwV -> set of ᑵᑷᑹᑻᑽᑿᒁ
+        prefix2syllabics = defaultdict(set)
+        for syllabic in table.values():
+            prefix = syllabic.prefix
+            if not prefix:
+                continue
+            prefix = prefix + "V"
+            prefix2syllabics[prefix].add(syllabic.cans)
+
+        # The syllabics that a final (and w) combine with, grouped by prefix:
+        # kwV -> [ᑵ, ᑷ, ᑹ, ᑻ, ᑽ, ᑿ, ᒁ]
+        prefix2syllable_rules = defaultdict(list)
+        for sro, syllabic in table.items():
+            if orthography.is_combining_syllable(sro):
+                prefix2syllable_rules[syllabic.prefix + "V"].append(syllabic)
+        for syllabics in prefix2syllable_rules.values():
+            syllabics.sort(key=lambda syllabic: syllabic.cans)
+
+    with profiler.phase("rule emission"):
+        emit(
+            f"""
+c AUTOGENERATED FILE - DO NOT MODIFY!
+store(&VERSION) '10.0'
+store(&TARGETS) 'mobile'
+store(&NAME) '{name}'
+store(&COPYRIGHT) 'Copyright © 2019, 2020 National Research Council Canada'
+store(&KEYBOARDVERSION) '{version}'
+{css_line}
+store(&LAYOUTFILE) 'nrc_crk_cans.keyman-touch-layout'
+""".lstrip()
+        )
+
+        emit("c These are used for backspace rules:")
+        for prefix, syllabics in prefix2syllabics.items():
+            syllabics_list = "".join(sorted(syllabics))
+            emit(f"store({prefix}) '{syllabics_list}'")
+
+        if compact:
+            stores, compact_rules = plan_compact_syllabic_rules(
+                orthography, prefix2syllable_rules, prefix2syllabics, vowel_hack
+            )
+            emit("c These are used for syllable rules:")
+            for store_name, value in stores.items():
+                emit(f"store({store_name}) {value}")
+
+        emit()
+
+        emit(
+            f"""
+begin Unicode > use(main)
+group(main) using keys
+"""
+        )
+
+        if compact:
+            emit_compact_syllabic_rules(emit, orthography, compact_rules)
+        else:
+            # Generate rules that replace a final and a vowel with the composed syllabic
+            #    U+XXXX + [U_YYYY] > U+YYYY layer('default')
+            #   e.g. when [ ᐘ ] has been pressed following a ᐤ, insert ᐘ and switch to 'default' layer.
+            for sro, syllabic in table.items():
+                if not orthography.is_combining_syllable(sro):
+                    continue
+
+                emit_syllabic_rule(emit, orthography, syllabic)
+                # Create a hacky rule that allows for a standalone vowel to convert into
+                # the correct syllable.
+                if vowel_hack and is_non_w_syllable(syllabic):
+                    vowel = table[syllabic.vowel]
+                    emit_syllabic_rule(emit, orthography, syllabic, vowel)
+
+        # Rules that decompose a syllable + backspace into its component consonants
+        emit("  c Backspace rules: break apart a syllable on backspace")
+        for prefix in prefix2syllabics:
+            consonants = orthography.split_prefix(prefix[:-1])
+            consonant_chars = " ".join(table[c].as_character for c in consonants)
+            emit(f"  any({prefix}) + [K_BKSP] > {consonant_chars} layer('{prefix}')")
+
+    return out.getvalue()
+
+
+def emit_syllabic_rule(
+    emit, orthography: Orthography, syllabic, accept_syllabic=None
+):
+    if accept_syllabic is None:
+        accept_syllabic = syllabic
+
+    table = orthography.syllabics
+    consonants = orthography.split_prefix(syllabic.prefix)
+    final = table[consonants[0]]
+    keycode = accept_syllabic.as_keycode
+    composed_syllable = syllabic.as_character
+
+    if len(consonants) == 1:
+        w = ""
+        context = final.as_character
+    else:
+        w = " ᐤ"
+        context = f"{final.as_character} {table['w'].as_character}"
+
+    emit(f"  {context} + [{keycode}] > {composed_syllable} layer('default')", end=" ")
+    emit(f"c {final}{w} + [ {accept_syllabic} ] > {syllabic}")
+
+
+def plan_compact_syllabic_rules(
+    orthography: Orthography, prefix2syllable_rules, prefix2syllabics, vowel_hack
+):
+    """
+    Returns the stores that compact syllable rules need ({name: value}), and
+    the rules themselves as (prefix, key store, output store) triples.
+
+    Stores are reused wherever possible: the output of kV rules is the kV
+    backspace store, and all vowel keys stores with the same order are one.
+    """
+    stores = {}
+    vowel_stores = {}
+    rules = []
+    for prefix, syllabics in prefix2syllable_rules.items():
+        cans = "".join(syllabic.cans for syllabic in syllabics)
+        if cans == "".join(sorted(prefix2syllabics[prefix])):
+            output_store = prefix
+        else:
+            output_store = f"{prefix}syllabics"
+            stores[output_store] = f"'{cans}'"
+
+        key_store = f"{prefix}keys"
+        stores[key_store] = " ".join(f"[{s.as_keycode}]" for s in syllabics)
+        rules.append((prefix, key_store, output_store))
+
+        # Standalone vowels are accepted in place of syllabics (but not wV):
+        if vowel_hack and prefix != "wV":
+            vowels = " ".join(
+                f"[{orthography.syllabics[s.vowel].as_keycode}]" for s in syllabics
+            )
+            if vowels not in vowel_stores:
+                vowel_stores[vowels] = f"{prefix}vowels" if vowel_stores else "vowels"
+                stores[vowel_stores[vowels]] = vowels
+            rules.append((prefix, vowel_stores[vowels], output_store))
+    return stores, rules
+
+
+def emit_compact_syllabic_rules(emit, orthography: Orthography, rules):
+    """
+    Emits rules of the form
+
+        U+1420 + any(kVkeys) > index(kV, 2) layer('default')
+
+    each of which is equivalent to one rule per syllabic in kV.
+    """
+    table = orthography.syllabics
+    for prefix, key_store, output_store in rules:
+        consonants = orthography.split_prefix(prefix[:-1])
+        context = " ".join(table[c].as_character for c in consonants)
+        finals = "".join(table[c].cans for c in consonants)
+        # The offset of the key in the rule (after the consonants):
+        offset = len(consonants) + 1
+        emit(
+            f"  {context} + any({key_store}) > index({output_store}, {offset})"
+            f" layer('default') c {finals} + [ {key_store} ] > {output_store}"
+        )
+
+
+def count_rules(kmn: str) -> int:
+    """
+    Counts the rules (indented lines that are not comments) in .kmn source.
+    """
+    return sum(
+        1
+        for line in kmn.splitlines()
+        if line.startswith("  ") and not line.lstrip().startswith("c ")
+    )
+
+
+def is_non_w_syllable(syllabic):
+    return syllabic.prefix != "w"
+
+
+def write_kmn(
+    file: IO[str],
+    css: bool = False,
+    vowel_hack: bool = False,
+    compact: bool = False,
+    profiler=NULL_PROFILER,
+    dialect: str = DEFAULT_DIALECT,
+) -> None:
+    """
+    Writes the .kmn source code for the keyboard to file.
+    """
+    kmn = generate_kmn(
+        css=css,
+        vowel_hack=vowel_hack,
+        compact=compact,
+        profiler=profiler,
+        dialect=dialect,
+    )
+    with profiler.phase("serialization"):
+        file.write(kmn)
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# Copyright © 2020 Eddie Antonio Santos <Eddie.Santos@nrc-cnrc.gc.ca>
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Draws the layers of a touch layout as SVG images.
+
+Keys are placed like KeymanWeb places them: every key is "width" units wide
+(KEY_WIDTH by default) after "pad" units of padding (PADDING_BETWEEN by
+default), and is coloured according to its "sp" (the colours of the dark
+mode mockup in html-mockup/).
+
+Each layer is hashed together with the font and this module's source code.
+render_layers() only draws the layers whose hash is not the one recorded
+in the output directory, so regenerating the images after a small change
+only redraws the layers that changed.
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Tuple
+from xml.sax.saxutils import escape
+
+from .touch_layout import (
+    ACTIVE_KEY,
+    BLANK_KEY,
+    DEAD_KEY,
+    KEY_WIDTH,
+    NORMAL_KEY,
+    PADDING_BETWEEN,
+    SPACER,
+    SPECIAL_KEY,
+)
+
+__all__ = ["layer_digest", "render_layer", "render_layers"]
+
+# Recorded in the output directory: layer id -> digest of its image.
+MANIFEST_NAME = ".layer-digests.json"
+
+# Every image depends on how it is drawn, i.e., on this file:
+RENDERER_DIGEST = hashlib.sha256(Path(__file__).read_bytes()).digest()
+
+KEY_HEIGHT = KEY_WIDTH
+ROW_GAP = PADDING_BETWEEN
+FONT_SIZE = 35
+
+# Colours from html-mockup/dark-mode.css:
+KEYBOARD_BACKGROUND = "#464646"
+# sp -> (background, foreground); keys with no sp are normal keys.
+KEY_COLOURS = {
+    NORMAL_KEY: ("#4F4F4F", "#FFFFFF"),
+    SPECIAL_KEY: ("#5E5E5E", "#FFFFFF"),
+    ACTIVE_KEY: ("#76FCCD", "#000000"),
+    DEAD_KEY: ("#3A3D42", "#FFFFFF"),
+}
+
+# How KeymanWeb draws the text of special keys:
+SPECIAL_LABELS = {
+    "*BkSp*": "⌫",
+    "*Enter*": "⮐",
+    "*Menu*": "🌐",
+    "*Shift*": "⇧",
+    "*Shifted*": "⇧",
+    "*123*": "123",
+    "*ABC*": "ABC",
+    "*abc*": "abc",
+}
+
+
+class RenderResult(NamedTuple):
+    layer_id: str
+    filename: str
+    # False when the existing image was up to date:
+    rendered: bool
+
+
+def layer_digest(layer: dict, font: str) -> str:
+    """
+    Returns a digest of everything the image of the layer depends on.
+    """
+    digest = hashlib.sha256()
+    digest.update(RENDERER_DIGEST)
+    digest.update(font.encode("UTF-8"))
+    digest.update(
+        json.dumps(layer, sort_keys=True, ensure_ascii=False).encode("UTF-8")
+    )
+    return digest.hexdigest()
+
+
+def render_layer(layer: dict, font: str) -> str:
+    """
+    Returns the layer drawn as an SVG document.
+    """
+    shapes = []
+    width = 0
+    y = ROW_GAP
+    for row in layer["row"]:
+        x = 0
+        for key in row["key"]:
+            x += _number(key.get("pad"), PADDING_BETWEEN)
+            key_width = _number(key.get("width"), KEY_WIDTH)
+            shapes.extend(_draw_key(key, x, y, key_width))
+            x += key_width
+        width = max(width, x + PADDING_BETWEEN)
+        y += KEY_HEIGHT + ROW_GAP
+
+    return "\n".join(
+        [
+            '<svg xmlns="http://www.w3.org/2000/svg" '
+            f'width="{width}" height="{y}" viewBox="0 0 {width} {y}">',
+            f"<title>{escape(layer['id'])}</title>",
+            f'<rect width="{width}" height="{y}" fill="{KEYBOARD_BACKGROUND}"/>',
+            f'<g font-family="{escape(font)}" font-size="{FONT_SIZE}" '
+            'text-anchor="middle" dominant-baseline="central">',
+            *shapes,
+            "</g>",
+            "</svg>",
+            "",
+        ]
+    )
+
+
+def _number(value, default: int) -> int:
+    # Keyman writes numbers as strings, and sometimes as "".
+    return int(value) if value else default
+
+
+def _draw_key(key: dict, x: int, y: int, width: int) -> List[str]:
+    style = key.get("sp", NORMAL_KEY)
+    if style in (SPACER, BLANK_KEY) or not key.get("id"):
+        return []
+    background, foreground = KEY_COLOURS.get(style, KEY_COLOURS[NORMAL_KEY])
+    shapes = [
+        f'<rect x="{x}" y="{y}" width="{width}" height="{KEY_HEIGHT}" rx="8" '
+        f'fill="{background}"/>'
+    ]
+    text = key.get("text", "")
+    label = SPECIAL_LABELS.get(text, text)
+    if label:
+        shapes.append(
+            f'<text x="{x + width / 2:g}" y="{y + KEY_HEIGHT / 2:g}" '
+            f'fill="{foreground}">{escape(label)}</text>'
+        )
+    if key.get("sk"):
+        # Show the first long-press key in the corner:
+        hint = key["sk"][0].get("text", "")
+        shapes.append(
+            f'<text x="{x + width - 12}" y="{y + 16}" '
+            f'font-size="{FONT_SIZE // 2}" fill="{foreground}">{escape(hint)}</text>'
+        )
+    return shapes
+
+
+def _render_to_file(task: Tuple[dict, str, str]) -> None:
+    layer, font, filename = task
+    with open(filename, "w", encoding="UTF-8") as image_file:
+        image_file.write(render_layer(layer, font))
+
+
+def render_layers(
+    touch_layout: dict, outdir: str, jobs: int = None, force: bool = False
+) -> List[RenderResult]:
+    """
+    Writes outdir/layout-LAYER.svg for every layer of the (phone) touch
+    layout, on a pool of worker processes. Layers whose image is up to date
+    are skipped, unless force is True.
+    """
+    phone = touch_layout["phone"]
+    font = phone.get("font", "sans-serif")
+    outdir_path = Path(outdir)
+    outdir_path.mkdir(parents=True, exist_ok=True)
+    manifest_path = outdir_path / MANIFEST_NAME
+    manifest: Dict[str, str] = {}
+    if not force and manifest_path.exists():
+        manifest = json.loads(manifest_path.read_text(encoding="UTF-8"))
+
+    results = []
+    tasks = []
+    digests = {}
+    for layer in phone["layer"]:
+        filename = str(outdir_path / f"layout-{layer['id']}.svg")
+        digest = layer_digest(layer, font)
+        digests[layer["id"]] = digest
+        up_to_date = manifest.get(layer["id"]) == digest and os.path.exists(filename)
+        if not up_to_date:
+            tasks.append((layer, font, filename))
+        results.append(RenderResult(layer["id"], filename, not up_to_date))
+
+    jobs = min(jobs or os.cpu_count() or 1, len(tasks)) or 1
+    if jobs == 1:
+        for task in tasks:
+            _render_to_file(task)
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            list(executor.map(_render_to_file, tasks))
+
+    manifest_path.write_text(json.dumps(digests, indent=2) + "\n", encoding="UTF-8")
+    return results
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# Copyright © 2020 Eddie Antonio Santos <Eddie.Santos@nrc-cnrc.gc.ca>
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Searches for better placements of the keys in an ASCII art LAYOUT.
+
+The cost of a layout has two parts:
+
+ - comfort: every slot has a comfort score (e.g., from the charts in
+   [Park 2008]); frequent keys should be in comfortable slots.
+ - travel: keys that are often typed one after another (bigrams) should be
+   close together.
+
+    cost = -Σ freq(key) × comfort(slot(key))
+           + travel_weight × Σ freq(a, b) × distance(slot(a), slot(b))
+
+Frequencies are normalized to sum to 1, and distances are measured in key
+widths. Only keys for SRO letters are moved; special keys (space, backspace,
+etc.) stay where they are.
+
+The search is simulated annealing over swaps of two keys. A swap only
+changes the terms involving the two swapped keys, so each step costs time
+proportional to the number of bigrams those keys appear in, rather than a
+full re-evaluation of the layout. Independent chains run on separate
+processes.
+
+[Park 2008]: https://www.sciencedirect.com/science/article/pii/S0169814109001036
+"""
+
+import math
+import os
+import random
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+
+__all__ = ["LayoutProblem", "Candidate", "optimize"]
+
+_KEY = re.compile(r"""\[\s*(\S+)\s*\]""")
+
+
+class Candidate(NamedTuple):
+    """
+    A key placement found by the search.
+    """
+
+    cost: float
+    # The label placed in each movable slot, in slot order.
+    labels: Tuple[str, ...]
+
+
+class LayoutProblem:
+    """
+    Everything needed to evaluate key placements of one ASCII art LAYOUT.
+
+    movable: the labels that may be moved
+    widths: the proportional width of each key, row by row (default: 1)
+    """
+
+    def __init__(
+        self,
+        layout: str,
+        movable: Sequence[str],
+        unigrams: Dict[str, float],
+        comfort: List[List[float]],
+        bigrams: Dict[Tuple[str, str], float] = None,
+        widths: List[List[float]] = None,
+        travel_weight: float = 0.1,
+    ):
+        self.layout = layout.strip("\n")
+        rows = [list(_KEY.finditer(line)) for line in self.layout.split("\n")]
+        if len(comfort) != len(rows) or any(
+            len(scores) != len(row) for scores, row in zip(comfort, rows)
+        ):
+            raise ValueError(
+                "comfort matrix must have one score per key in each row: "
+                f"expected {[len(row) for row in rows]}, "
+                f"got {[len(scores) for scores in comfort]}"
+            )
+
+        # Find the movable slots, and the geometric centre of each.
+        self.spans = []  # (row, start, end) of each movable slot in the art
+        initial = []
+        slot_comfort = []
+        centres = []
+        for row_index, row in enumerate(rows):
+            x = 0.0
+            for key_index, match in enumerate(row):
+                width = widths[row_index][key_index] if widths else 1
+                if match.group(1) in movable:
+                    self.spans.append((row_index, match.start(), match.end()))
+                    initial.append(match.group(1))
+                    slot_comfort.append(comfort[row_index][key_index])
+                    centres.append((x + width / 2, row_index + 0.5))
+                x += width
+        self.initial = tuple(initial)
+        self.comfort = slot_comfort
+        self.travel_weight = travel_weight
+
+        count = len(self.initial)
+        self.distance = [
+            [math.hypot(x1 - x2, y1 - y2) for x2, y2 in centres]
+            for x1, y1 in centres
+        ]
+
+        # Frequencies of keys, by index into self.initial.
+        index_of = {label: index for index, label in enumerate(self.initial)}
+        total = sum(unigrams.get(label, 0) for label in self.initial) or 1
+        self.frequency = [unigrams.get(label, 0) / total for label in self.initial]
+
+        # For every key, every other key it forms a bigram with (either way).
+        self.neighbours = [[] for _ in range(count)]
+        bigrams = {
+            (index_of[a], index_of[b]): weight
+            for (a, b), weight in (bigrams or {}).items()
+            if a in index_of and b in index_of and a != b
+        }
+        total = sum(bigrams.values()) or 1
+        combined = {}
+        for (a, b), weight in bigrams.items():
+            pair = (min(a, b), max(a, b))
+            combined[pair] = combined.get(pair, 0) + weight / total
+        for (a, b), weight in combined.items():
+            self.neighbours[a].append((b, weight))
+            self.neighbours[b].append((a, weight))
+
+    def cost(self, placement: Sequence[int]) -> float:
+        """
+        Computes the cost of a placement from scratch.
+
+        placement[key] is the slot that key (an index into self.initial) is
+        placed in.
+        """
+        comfort = -sum(
+            frequency * self.comfort[slot]
+            for frequency, slot in zip(self.frequency, placement)
+        )
+        travel = sum(
+            weight * self.distance[placement[a]][placement[b]]
+            for a, neighbours in enumerate(self.neighbours)
+            for b, weight in neighbours
+            if a < b
+        )
+        return comfort + self.travel_weight * travel
+
+    def swap_delta(self, placement: List[int], a: int, b: int) -> float:
+        """
+        How much the cost would change by swapping the slots of keys a and b.
+        """
+        slot_a, slot_b = placement[a], placement[b]
+        delta = (self.frequency[a] - self.frequency[b]) * (
+            self.comfort[slot_a] - self.comfort[slot_b]
+        )
+
+        travel = 0.0
+        distance = self.distance
+        for key, new_slot, old_slot in ((a, slot_b, slot_a), (b, slot_a, slot_b)):
+            for other, weight in self.neighbours[key]:
+                if other == a or other == b:
+                    # The distance between a and b does not change.
+                    continue
+                other_slot = placement[other]
+                travel += weight * (
+                    distance[new_slot][other_slot] - distance[old_slot][other_slot]
+                )
+        return delta + self.travel_weight * travel
+
+    def labels_for(self, placement: Sequence[int]) -> Tuple[str, ...]:
+        labels = [""] * len(placement)
+        for key, slot in enumerate(placement):
+            labels[slot] = self.initial[key]
+        return tuple(labels)
+
+    def render(self, labels: Sequence[str]) -> str:
+        """
+        Returns the ASCII art LAYOUT with the movable keys replaced by the
+        given labels, keeping every key the same width.
+        """
+        lines = self.layout.split("\n")
+        for (row, start, end), label in sorted(
+            zip(self.spans, labels), key=lambda item: item[0], reverse=True
+        ):
+            inner = end - start - 2
+            if inner >= len(label) + 2:
+                key = f"[ {label:^{inner - 2}} ]"
+            else:
+                key = f"[{label:^{inner}}]"
+            line = lines[row]
+            lines[row] = f"{line[:start]}{key}{line[end:]}"
+        return "\n".join(lines)
+
+    def anneal(
+        self,
+        seed: int,
+        steps: int = 200_000,
+        start_temperature: float = 0.01,
+        end_temperature: float = 1e-6,
+    ) -> Candidate:
+        """
+        Runs one simulated annealing chain from a random placement.
+        """
+        rng = random.Random(seed)
+        count = len(self.initial)
+        placement = list(range(count))
+        rng.shuffle(placement)
+        cost = self.cost(placement)
+        best_cost, best = cost, placement[:]
+
+        cooling = (end_temperature / start_temperature) ** (1 / max(steps, 1))
+        temperature = start_temperature
+        randrange = rng.randrange
+        uniform = rng.random
+        for _step in range(steps):
+            a = randrange(count)
+            b = randrange(count - 1)
+            if b >= a:
+                b += 1
+            delta = self.swap_delta(placement, a, b)
+            if delta < 0 or uniform() < math.exp(-delta / temperature):
+                placement[a], placement[b] = placement[b], placement[a]
+                cost += delta
+                if cost < best_cost:
+                    best_cost, best = cost, placement[:]
+            temperature *= cooling
+
+        # Recompute from scratch to shed accumulated rounding error.
+        return Candidate(self.cost(best), self.labels_for(best))
+
+
+def _run_chain(arguments):
+    problem, seed, steps = arguments
+    return problem.anneal(seed, steps)
+
+
+def optimize(
+    problem: LayoutProblem,
+    chains: int = None,
+    steps: int = 200_000,
+    seed: int = 0,
+    jobs: int = None,
+) -> List[Candidate]:
+    """
+    Runs independent annealing chains on all cores, returning distinct
+    candidates from best to worst.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    chains = chains or jobs
+    work = [(problem, seed + chain, steps) for chain in range(chains)]
+    if jobs == 1:
+        results = list(map(_run_chain, work))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(_run_chain, work))
+
+    distinct = {}
+    for candidate in results:
+        distinct.setdefault(candidate.labels, candidate)
+    return sorted(distinct.values())
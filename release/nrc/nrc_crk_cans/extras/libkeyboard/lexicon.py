@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# Copyright © 2020 Eddie Antonio Santos <Eddie.Santos@nrc-cnrc.gc.ca>
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+A compact, frequency-weighted word list for predictive text.
+
+Words are runs of the syllabics of SYLLABICS (for the chosen dialect);
+anything else (spaces, punctuation, Latin letters, digits) separates words,
+so "ᓀᐦᐃᔭᐍᐏᐣ." and "ᓀᐦᐃᔭᐍᐏᐣ" are the same word. The separate w-dot (ᐧ) is
+not in SYLLABICS either, so text written with it is split into words
+around it.
+
+The words are stored in a trie packed into flat arrays, in breadth-first
+order, so that the children of every node are contiguous:
+
+    labels[n]       the syllabic on the edge into node n
+    child_start[n]  the first child of node n (its last is child_start[n+1] - 1)
+    frequency[n]    how often the word ending at node n occurs (0: none does)
+    best[n]         the highest frequency of any word at or below node n
+
+best lets top-k completion search the most promising branches first and
+stop as soon as it has k words, without visiting the rest of the subtree. (A
+minimized DAWG would be smaller, but merging shared suffixes loses exactly
+this per-branch frequency.) Each node takes 14 bytes, and the arrays can be
+saved and loaded as they are.
+"""
+
+import heapq
+import re
+import struct
+import sys
+from array import array
+from collections import Counter
+from itertools import groupby
+from typing import IO, Dict, Iterable, Iterator, List, Tuple
+
+from . import corpus
+from .syllabics import DEFAULT_DIALECT, syllabics_for
+
+__all__ = ["Lexicon", "count_words", "word_pattern", "write_wordlist"]
+
+MAGIC = b"CRKLEX\0\1"
+# Magic, node count, and the length of the labels in bytes:
+_HEADER = struct.Struct("<8sII")
+
+
+def word_pattern(dialect: str = DEFAULT_DIALECT) -> "re.Pattern":
+    """
+    Matches one word: a run of the dialect's syllabics.
+    """
+    characters = "".join(sorted(s.cans for s in syllabics_for(dialect).values()))
+    return re.compile(f"[{re.escape(characters)}]+")
+
+
+def count_words(chunks: Iterable[str], dialect: str = DEFAULT_DIALECT) -> Counter:
+    """
+    Returns the frequency of each word in text that arrives in chunks.
+    """
+    return corpus.count_words(chunks, word_pattern(dialect))
+
+
+class Lexicon:
+    """
+    Words and their frequencies, in a packed trie.
+    """
+
+    def __init__(self, labels: str, child_start, frequency, best):
+        self.labels = labels
+        self.child_start = child_start
+        self.frequency = frequency
+        self.best = best
+
+    @classmethod
+    def from_frequencies(cls, frequencies: Dict[str, int]) -> "Lexicon":
+        frequencies = {word: count for word, count in frequencies.items() if count > 0}
+        words = sorted(word for word in frequencies if word)
+
+        # The nodes at each depth are the distinct prefixes of that length. In
+        # sorted order, they are grouped by parent, and the parents are in the
+        # order of the previous depth: exactly the breadth-first order.
+        labels = ["\0"]  # the root has no label
+        frequency = array("I", [0])
+        child_start = array("I")
+        position = 1
+        level = [""]
+        while level:
+            depth = len(level[0])
+            words = [word for word in words if len(word) > depth]
+            children = [0] * len(level)
+            next_level = []
+            parent = 0
+            for prefix, _ in groupby(word[: depth + 1] for word in words):
+                while level[parent] != prefix[:-1]:
+                    parent += 1
+                children[parent] += 1
+                next_level.append(prefix)
+                labels.append(prefix[-1])
+                frequency.append(frequencies.get(prefix, 0))
+            for count in children:
+                child_start.append(position)
+                position += count
+            level = next_level
+        child_start.append(position)
+
+        # Children always come after their parent, so one backward pass
+        # computes the best frequency of every subtree.
+        best = array("I", frequency)
+        for node in range(len(frequency) - 1, -1, -1):
+            for child in range(child_start[node], child_start[node + 1]):
+                if best[child] > best[node]:
+                    best[node] = best[child]
+        return cls("".join(labels), child_start, frequency, best)
+
+    def __len__(self) -> int:
+        return sum(1 for count in self.frequency if count)
+
+    @property
+    def node_count(self) -> int:
+        return len(self.frequency)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The size of the packed trie (as saved, and roughly as held in memory).
+        """
+        arrays = (self.child_start, self.frequency, self.best)
+        return 2 * len(self.labels) + sum(a.itemsize * len(a) for a in arrays)
+
+    def _find(self, prefix: str) -> int:
+        """
+        Returns the node reached by the prefix, or -1.
+        """
+        labels, child_start = self.labels, self.child_start
+        node = 0
+        for char in prefix:
+            node = labels.find(char, child_start[node], child_start[node + 1])
+            if node < 0:
+                return -1
+        return node
+
+    def frequency_of(self, word: str) -> int:
+        node = self._find(word)
+        return self.frequency[node] if node > 0 else 0
+
+    def complete(self, prefix: str, k: int = 3) -> List[Tuple[str, int]]:
+        """
+        Returns the k most frequent words that start with prefix (including
+        the prefix itself, if it is a word), with their frequencies.
+        """
+        node = self._find(prefix)
+        if node < 0 or k <= 0:
+            return []
+        labels, child_start = self.labels, self.child_start
+        frequency, best = self.frequency, self.best
+        completions = []
+        # (-priority, tie breaker, node, word, is this the word at the node?)
+        heap = [(-best[node], 0, node, prefix, False)]
+        pushed = 1
+        while heap and len(completions) < k:
+            priority, _, node, word, is_word = heapq.heappop(heap)
+            if is_word:
+                completions.append((word, -priority))
+                continue
+            if frequency[node]:
+                heapq.heappush(heap, (-frequency[node], pushed, node, word, True))
+                pushed += 1
+            for child in range(child_start[node], child_start[node + 1]):
+                heapq.heappush(
+                    heap, (-best[child], pushed, child, word + labels[child], False)
+                )
+                pushed += 1
+        return completions
+
+    def items(self) -> Iterator[Tuple[str, int]]:
+        """
+        Yields every word and its frequency, in alphabetical order.
+        """
+        labels, child_start, frequency = self.labels, self.child_start, self.frequency
+        stack = [(0, "")]
+        while stack:
+            node, word = stack.pop()
+            if frequency[node]:
+                yield word, frequency[node]
+            children = range(child_start[node], child_start[node + 1])
+            stack.extend((child, word + labels[child]) for child in reversed(children))
+
+    def save(self, file: IO[bytes]):
+        labels = self.labels.encode("UTF-16-LE")
+        file.write(_HEADER.pack(MAGIC, self.node_count, len(labels)))
+        file.write(labels)
+        for values in (self.child_start, self.frequency, self.best):
+            file.write(_little_endian(values).tobytes())
+
+    @classmethod
+    def load(cls, file: IO[bytes]) -> "Lexicon":
+        magic, node_count, label_size = _HEADER.unpack(file.read(_HEADER.size))
+        if magic != MAGIC:
+            raise ValueError("not a lexicon file")
+        labels = file.read(label_size).decode("UTF-16-LE")
+        arrays = []
+        for count in (node_count + 1, node_count, node_count):
+            values = array("I")
+            values.frombytes(file.read(count * values.itemsize))
+            arrays.append(_little_endian(values))
+        return cls(labels, *arrays)
+
+
+def _little_endian(values: array) -> array:
+    if sys.byteorder == "little":
+        return values
+    swapped = array(values.typecode, values)
+    swapped.byteswap()
+    return swapped
+
+
+def write_wordlist(file: IO[str], words: Iterable[Tuple[str, int]]):
+    """
+    Writes words and their frequencies in the TSV format of a Keyman
+    wordlist lexical model (most frequent first).
+    """
+    file.write("# Generated by build-lexicon.py\n")
+    for word, count in sorted(words, key=lambda item: (-item[1], item[0])):
+        file.write(f"{word}\t{count}\n")
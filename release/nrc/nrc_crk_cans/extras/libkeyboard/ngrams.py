@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# Copyright © 2020 Eddie Antonio Santos <Eddie.Santos@nrc-cnrc.gc.ca>
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Counts syllabics, keys, and words in a syllabics corpus.
+
+Three kinds of statistics are collected:
+
+ - syllabics: how often each syllabic occurs, and how often each pair of
+   syllabics occurs next to each other;
+ - keys: how often each key of the touch keyboard (an SRO consonant or
+   vowel, e.g., ᑿ is typed with k, w, a) is pressed, and how often each pair
+   of keys is pressed one after another. These are derived from the
+   syllabics counts, and are the unigrams and bigrams the layout is
+   designed around;
+ - words: how often each word occurs.
+
+Syllabic counts are kept in flat arrays indexed by the dense IDs of
+SYLLABICS_BY_CODEPOINT, so their size is fixed. Word counts are exact by
+default; in sketch mode they are kept in a count-min sketch of fixed size,
+and only the most frequent words are remembered. Counts from different
+shards of a corpus can be merged.
+"""
+
+import heapq
+import zlib
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Iterable, Iterator, List, Tuple
+
+from .corpus import split_words
+from .syllabics import BLOCK_START, SYLLABICS_BY_CODEPOINT
+
+__all__ = ["NgramCounts", "CountMinSketch", "count_text"]
+
+_RECORDS = SYLLABICS_BY_CODEPOINT.by_id
+_IDS = SYLLABICS_BY_CODEPOINT.ids
+_SYLLABIC_COUNT = len(_RECORDS)
+
+
+def _keys_of(record) -> Tuple[str, ...]:
+    """
+    The keys pressed to type a syllabic: ᑿ is k, w, a; ᕽ is hk.
+    """
+    if record.type == "syllable":
+        return (*record.prefix, record.vowel)
+    return (record.sro,)
+
+
+_KEYS = tuple(sorted({key for record in _RECORDS for key in _keys_of(record)}))
+_KEY_IDS = {key: index for index, key in enumerate(_KEYS)}
+# The key IDs that type each syllabic, indexed by syllabic ID.
+_KEYS_BY_SYLLABIC = tuple(
+    tuple(_KEY_IDS[key] for key in _keys_of(record)) for record in _RECORDS
+)
+
+
+def _zeros(length: int) -> array:
+    return array("Q", bytes(8 * length))
+
+
+class CountMinSketch:
+    """
+    Approximate counts of strings in a fixed amount of memory.
+
+    Estimates are never lower than the true count. Sketches with the same
+    width and depth can be merged by adding them together, even if they were
+    built in different processes.
+    """
+
+    __slots__ = ("width", "depth", "table")
+
+    def __init__(self, width: int = 1 << 16, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.table = _zeros(width * depth)
+
+    def _cells(self, item: str) -> List[int]:
+        # crc32 is stable across processes, unlike hash().
+        data = item.encode("UTF-8")
+        width = self.width
+        return [
+            row * width + zlib.crc32(data, row) % width for row in range(self.depth)
+        ]
+
+    def add(self, item: str, count: int = 1) -> int:
+        """
+        Adds count to the item, returning its new estimated count.
+        """
+        table = self.table
+        estimate = None
+        for cell in self._cells(item):
+            table[cell] += count
+            if estimate is None or table[cell] < estimate:
+                estimate = table[cell]
+        return estimate
+
+    def estimate(self, item: str) -> int:
+        table = self.table
+        return min(table[cell] for cell in self._cells(item))
+
+    def merge(self, other: "CountMinSketch"):
+        if (self.width, self.depth) != (other.width, other.depth):
+            raise ValueError("can only merge sketches of the same dimensions")
+        table = self.table
+        for index, count in enumerate(other.table):
+            if count:
+                table[index] += count
+
+
+class NgramCounts:
+    """
+    Unigram and bigram statistics of a syllabics corpus.
+
+    If sketch_width is given, word counts are kept in a count-min sketch of
+    that width, and only (about) the top_words most frequent words are
+    remembered.
+    """
+
+    def __init__(self, sketch_width: int = None, top_words: int = 10_000):
+        self.syllabics = _zeros(_SYLLABIC_COUNT)
+        self.syllabic_bigrams = _zeros(_SYLLABIC_COUNT * _SYLLABIC_COUNT)
+        self.top_words = top_words
+        self.sketch = CountMinSketch(sketch_width) if sketch_width else None
+        # Exact counts, or estimates for the current heavy hitters.
+        self.words = {}
+        # In sketch mode, a min-heap of (estimate, word) for the words above,
+        # so the least frequent can be replaced quickly. Estimates only ever
+        # grow, so an entry that does not match self.words is stale.
+        self._heap = []
+
+    def add_text(self, text: str):
+        """
+        Counts all of the whitespace-separated words in the text.
+        """
+        self._add_words(Counter(text.split()))
+
+    def add_chunks(self, chunks: Iterable[str]):
+        """
+        Counts text that arrives in chunks which may split words.
+        """
+        for words in split_words(chunks):
+            self._add_words(Counter(words))
+
+    def _add_words(self, frequencies):
+        # Everything is counted once per distinct word, weighted by frequency.
+        unigrams = self.syllabics
+        bigrams = self.syllabic_bigrams
+        ids = _IDS
+        span = len(ids)
+        width = _SYLLABIC_COUNT
+
+        for word, frequency in frequencies.items():
+            previous = -1
+            for char in word:
+                offset = ord(char) - BLOCK_START
+                current = ids[offset] if 0 <= offset < span else -1
+                if current >= 0:
+                    unigrams[current] += frequency
+                    if previous >= 0:
+                        bigrams[previous * width + current] += frequency
+                previous = current
+            self._add_word(word, frequency)
+
+    def _add_word(self, word: str, frequency: int):
+        if self.sketch is None:
+            self.words[word] = self.words.get(word, 0) + frequency
+            return
+
+        estimate = self.sketch.add(word, frequency)
+        words = self.words
+        if word not in words and len(words) >= 2 * self.top_words:
+            # The table is full: the new word replaces the least frequent one,
+            # if it is more frequent.
+            if estimate <= self._least_frequent():
+                return
+            del words[heapq.heappop(self._heap)[1]]
+        words[word] = estimate
+        heapq.heappush(self._heap, (estimate, word))
+        if len(self._heap) > 4 * len(words):
+            self._rebuild_heap()
+
+    def _least_frequent(self) -> int:
+        heap, words = self._heap, self.words
+        while heap[0][0] != words.get(heap[0][1]):
+            heapq.heappop(heap)
+        return heap[0][0]
+
+    def _rebuild_heap(self):
+        self._heap = [(estimate, word) for word, estimate in self.words.items()]
+        heapq.heapify(self._heap)
+
+    def _prune_words(self):
+        if len(self.words) > 2 * self.top_words:
+            survivors = sorted(self.words.items(), key=lambda item: -item[1])
+            self.words = dict(survivors[: 2 * self.top_words])
+        self._rebuild_heap()
+
+    def merge(self, other: "NgramCounts") -> "NgramCounts":
+        """
+        Adds the counts from other into these counts. Returns self.
+        """
+        for mine, theirs in (
+            (self.syllabics, other.syllabics),
+            (self.syllabic_bigrams, other.syllabic_bigrams),
+        ):
+            for index, count in enumerate(theirs):
+                if count:
+                    mine[index] += count
+
+        if self.sketch is None:
+            for word, count in other.words.items():
+                self.words[word] = self.words.get(word, 0) + count
+        else:
+            self.sketch.merge(other.sketch)
+            candidates = set(self.words) | set(other.words)
+            self.words = {word: self.sketch.estimate(word) for word in candidates}
+            self._prune_words()
+        return self
+
+    ############################# Derived counts #############################
+
+    def syllabic_counts(self) -> Iterator[Tuple[str, int]]:
+        for record, count in zip(_RECORDS, self.syllabics):
+            if count:
+                yield record.cans, count
+
+    def syllabic_bigram_counts(self) -> Iterator[Tuple[str, str, int]]:
+        width = _SYLLABIC_COUNT
+        for index, count in enumerate(self.syllabic_bigrams):
+            if count:
+                yield _RECORDS[index // width].cans, _RECORDS[index % width].cans, count
+
+    def key_counts(self) -> Iterator[Tuple[str, int]]:
+        counts = [0] * len(_KEYS)
+        for keys, count in zip(_KEYS_BY_SYLLABIC, self.syllabics):
+            for key in keys:
+                counts[key] += count
+        return ((key, count) for key, count in zip(_KEYS, counts) if count)
+
+    def key_bigram_counts(self) -> Iterator[Tuple[str, str, int]]:
+        width = len(_KEYS)
+        counts = [0] * (width * width)
+        # Keys pressed one after another within a single syllabic...
+        for keys, count in zip(_KEYS_BY_SYLLABIC, self.syllabics):
+            for first, second in zip(keys, keys[1:]):
+                counts[first * width + second] += count
+        # ...and from the last key of one syllabic to the first of the next.
+        for index, count in enumerate(self.syllabic_bigrams):
+            if count:
+                first = _KEYS_BY_SYLLABIC[index // _SYLLABIC_COUNT][-1]
+                second = _KEYS_BY_SYLLABIC[index % _SYLLABIC_COUNT][0]
+                counts[first * width + second] += count
+        return (
+            (_KEYS[index // width], _KEYS[index % width], count)
+            for index, count in enumerate(counts)
+            if count
+        )
+
+    def word_counts(self) -> List[Tuple[str, int]]:
+        """
+        Words from most to least frequent. In sketch mode, only the heavy
+        hitters are listed, and their counts are (over-)estimates.
+        """
+        ranked = sorted(self.words.items(), key=lambda item: (-item[1], item[0]))
+        if self.sketch is not None:
+            return ranked[: self.top_words]
+        return ranked
+
+    def write_tsv(self, prefix: str):
+        """
+        Writes PREFIX.{unigrams,bigrams,syllabics,syllabic-bigrams,words}.tsv.
+
+        unigrams.tsv and bigrams.tsv count keys, in the shape that
+        optimize-layout.py reads; words.tsv is in the shape that
+        analyze-tap-cost.py --word-frequencies reads.
+        """
+        tables = {
+            "unigrams": (("key", "count"), self.key_counts()),
+            "bigrams": (("first", "second", "count"), self.key_bigram_counts()),
+            "syllabics": (("syllabic", "count"), self.syllabic_counts()),
+            "syllabic-bigrams": (
+                ("first", "second", "count"),
+                self.syllabic_bigram_counts(),
+            ),
+            "words": (("word", "count"), self.word_counts()),
+        }
+        for name, (header, rows) in tables.items():
+            rows = sorted(rows, key=lambda row: -row[-1])
+            path = Path(f"{prefix}.{name}.tsv")
+            with open(path, "w", encoding="UTF-8") as tsv_file:
+                print(*header, sep="\t", file=tsv_file)
+                for row in rows:
+                    print(*row, sep="\t", file=tsv_file)
+
+
+def count_text(text: str, sketch_width: int = None, top_words: int = 10_000):
+    """
+    Counts a single piece of text (e.g., one shard of a corpus).
+    """
+    counts = NgramCounts(sketch_width, top_words)
+    counts.add_text(text)
+    return counts
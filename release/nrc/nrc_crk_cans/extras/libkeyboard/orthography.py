@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# Copyright © 2020 Eddie Antonio Santos <Eddie.Santos@nrc-cnrc.gc.ca>
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+The consonants and vowels of each dialect, derived from syllabics.tsv.
+
+    >>> orthography_for("woods").combining_consonants
+    ('p', 't', 'k', 'c', 'm', 'n', 's', 'y', 'th')
+"""
+
+from functools import lru_cache
+from typing import Mapping, NamedTuple, Tuple
+
+from .syllabics import DEFAULT_DIALECT, Syllabic, syllabics_for
+
+__all__ = ["Orthography", "orthography_for"]
+
+
+class Orthography(NamedTuple):
+    """
+    Everything the generators need to know about a dialect.
+    """
+
+    dialect: str
+    # SRO -> Syllabic, for this dialect only:
+    syllabics: Mapping[str, Syllabic]
+    # All consonants that combine with vowels to create syllabics (except w),
+    # in the order they appear in syllabics.tsv:
+    combining_consonants: Tuple[str, ...]
+    # All the vowels:
+    vowels: Tuple[str, ...]
+
+    def split_prefix(self, prefix: str) -> Tuple[str, ...]:
+        """
+        Splits the consonants of a syllable into the final and w, e.g.,
+        "thw" -> ("th", "w"), "k" -> ("k",), and "w" -> ("w",).
+        """
+        if prefix != "w" and prefix.endswith("w"):
+            return (prefix[:-1], "w")
+        return (prefix,)
+
+    def is_combining_syllable(self, sro: str) -> bool:
+        """
+        True when the syllabic is formed by pressing a vowel after a final
+        (and w).
+        """
+        syllabic = self.syllabics.get(sro)
+        if syllabic is None or syllabic.type != "syllable":
+            return False
+        return self.split_prefix(syllabic.prefix)[0] in (
+            *self.combining_consonants,
+            "w",
+        )
+
+
+@lru_cache(maxsize=None)
+def orthography_for(dialect: str = DEFAULT_DIALECT) -> Orthography:
+    """
+    Returns the orthography of a dialect, built the first time it is needed.
+    """
+    syllabics = syllabics_for(dialect)
+    consonants = {}
+    vowels = {}
+    for syllabic in syllabics.values():
+        if syllabic.type == "vowel":
+            vowels[syllabic.sro] = None
+        elif syllabic.type == "syllable" and syllabic.prefix != "w":
+            consonants[syllabic.prefix.rstrip("w") or "w"] = None
+    return Orthography(dialect, syllabics, tuple(consonants), tuple(vowels))
@@ -9,9 +9,16 @@
 
 """
 Constants regarding Plains Cree orthography
+
+These are derived from syllabics.tsv; see libkeyboard.orthography for the
+other dialects.
 """
 
-# All constants that combine with vowels to create syllabics
-COMBINING_CONSONANTS = "ptkcmnsy"
-# All the vowels
-VOWELS = "êiîoôaâ"
+from .orthography import orthography_for
+
+_plains_cree = orthography_for("plains")
+
+# All constants that combine with vowels to create syllabics ("ptkcmnsy")
+COMBINING_CONSONANTS = "".join(_plains_cree.combining_consonants)
+# All the vowels ("êiîoôaâ")
+VOWELS = "".join(_plains_cree.vowels)
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# Copyright © 2020 Eddie Antonio Santos <Eddie.Santos@nrc-cnrc.gc.ca>
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Measures the time and peak memory of each phase of a build.
+
+    profiler = PhaseProfiler()
+    with profiler.phase("layout parse"):
+        ...
+    profiler.report()
+
+Phases may be nested and entered many times: each phase's time excludes the
+time spent in the phases nested within it, and is summed over every time the
+phase was entered. Peak memory is the most memory allocated (by Python,
+according to tracemalloc) above what was allocated when the phase was
+entered.
+"""
+
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, List, NamedTuple, Optional
+
+__all__ = ["PhaseProfiler", "NULL_PROFILER"]
+
+
+class PhaseStatistics(NamedTuple):
+    name: str
+    seconds: float
+    # None when memory was not measured:
+    peak_bytes: Optional[int]
+    calls: int
+
+
+class _Frame:
+    __slots__ = ("name", "start", "start_memory", "peak", "nested_seconds")
+
+    def __init__(self, name, start, start_memory):
+        self.name = name
+        self.start = start
+        self.start_memory = start_memory
+        self.peak = start_memory
+        self.nested_seconds = 0.0
+
+
+def _reset_peak():
+    # tracemalloc.reset_peak() is new in Python 3.9. Without it, peaks are
+    # measured since tracing started, and so may be overestimates.
+    if hasattr(tracemalloc, "reset_peak"):
+        tracemalloc.reset_peak()
+
+
+class PhaseProfiler:
+    """
+    Collects statistics for each named phase, in the order they first ran.
+    """
+
+    def __init__(self, trace_memory: bool = True):
+        self.trace_memory = trace_memory
+        self._stack: List[_Frame] = []
+        self._phases: Dict[str, List] = {}
+
+    def add(self, name: str, seconds: float, peak_bytes: Optional[int] = None):
+        """
+        Records a phase that was measured some other way.
+        """
+        self._phases[name] = [seconds, peak_bytes, 1]
+
+    @contextmanager
+    def phase(self, name: str):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        memory = self._memory()
+        if self._stack:
+            parent = self._stack[-1]
+            parent.peak = max(parent.peak, memory[1])
+        _reset_peak()
+        frame = _Frame(name, time.perf_counter(), memory[0])
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - frame.start
+            frame.peak = max(frame.peak, self._memory()[1])
+            self._stack.pop()
+            if self._stack:
+                parent = self._stack[-1]
+                parent.nested_seconds += elapsed
+                parent.peak = max(parent.peak, frame.peak)
+            _reset_peak()
+            self._record(frame, elapsed - frame.nested_seconds)
+
+    def _memory(self):
+        if self.trace_memory:
+            return tracemalloc.get_traced_memory()
+        return (0, 0)
+
+    def _record(self, frame: _Frame, seconds: float):
+        peak = frame.peak - frame.start_memory if self.trace_memory else None
+        statistics = self._phases.setdefault(frame.name, [0.0, peak, 0])
+        statistics[0] += seconds
+        if peak is not None:
+            statistics[1] = max(statistics[1] or 0, peak)
+        statistics[2] += 1
+
+    @property
+    def phases(self) -> List[PhaseStatistics]:
+        return [
+            PhaseStatistics(name, *statistics)
+            for name, statistics in self._phases.items()
+        ]
+
+    def report(self, file=None):
+        """
+        Prints a table of every phase (to stderr, by default).
+        """
+        file = file or sys.stderr
+        header = f"{'phase':<32} {'calls':>6} {'time (ms)':>10} {'peak (KiB)':>11}"
+        print(header, file=file)
+        for phase in self.phases:
+            if phase.peak_bytes is None:
+                peak = "-"
+            else:
+                peak = f"{phase.peak_bytes / 1024:.1f}"
+            print(
+                f"{phase.name:<32} {phase.calls:>6} {phase.seconds * 1000:>10.3f} "
+                f"{peak:>11}",
+                file=file,
+            )
+
+
+class _NullProfiler:
+    """
+    A profiler that measures nothing, at almost no cost.
+    """
+
+    @contextmanager
+    def phase(self, name: str):
+        yield
+
+
+NULL_PROFILER = _NullProfiler()
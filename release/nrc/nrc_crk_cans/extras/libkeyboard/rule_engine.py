@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# Copyright © 2020 Eddie Antonio Santos <Eddie.Santos@nrc-cnrc.gc.ca>
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Executes the generated .kmn rules and touch layout in Python.
+
+Only the subset of the Keyman language that generate-kmn.py emits is
+supported: stores, and rules of the form
+
+    CONTEXT + KEY > OUTPUT layer('LAYER')
+
+where CONTEXT is a sequence of U+XXXX characters and any(STORE), KEY is
+[KEY] or any(STORE), and OUTPUT is a sequence of U+XXXX characters and
+index(STORE, OFFSET). Rules that use index() are expanded into one rule per
+item of the store it refers to.
+
+Instead of scanning the rules in order for every keystroke (as Keyman does),
+rules are compiled into a table indexed by keycode and then by context, so
+each keystroke costs a handful of dictionary lookups.
+"""
+
+import itertools
+import json
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+__all__ = ["Keyboard", "Rule", "default_output", "parse_kmn"]
+
+_STORE = re.compile(r"""^store\((?P<name>[^)&]+)\)\s+(?P<value>.*?)\s*$""")
+_RULE = re.compile(
+    r"""
+    ^(?P<context>.*?)\s*\+\s*
+    (?P<key>\[\w+\]|any\([^)]+\))\s*>\s*
+    (?P<output>.*?)
+    (?:\s+c\s.*)?$      # trailing comment
+    """,
+    re.VERBOSE,
+)
+# Items are separated by whitespace, except within quotes and parentheses:
+_ITEM = re.compile(r"""'[^']*'|"[^"]*"|\w+\([^)]*\)|\S+""")
+_CHARACTER = re.compile(r"^U\+([0-9A-Fa-f]{4,6})$")
+_KEY = re.compile(r"^\[(?P<key>\w+)\]$")
+_ANY = re.compile(r"^any\((?P<store>[^)]+)\)$")
+_INDEX = re.compile(r"^index\((?P<store>[^,\s]+)\s*,\s*(?P<offset>\d+)\)$")
+_LAYER = re.compile(r"""^layer\('(?P<layer>[^']*)'\)$""")
+
+
+class Rule(NamedTuple):
+    """
+    A single rule from a .kmn file.
+
+    Each element of the context is a string of all of the characters that
+    can match at that position.
+    """
+
+    context: Tuple[str, ...]
+    key: str
+    output: str
+    layer: Optional[str]
+
+
+class _Action(NamedTuple):
+    """
+    What happens when a key on a particular layer is pressed and no rule
+    matches it.
+    """
+
+    key: str
+    output: str
+    nextlayer: Optional[str]
+
+
+# Keys that have a built-in behaviour when no rule matches:
+_DEFAULT_OUTPUT = {"K_SPACE": " ", "K_ENTER": "\n"}
+# Keys that only ever switch layers (or do nothing at all):
+_NO_OUTPUT = {
+    "K_BKSP",
+    "K_LOPT",
+    "K_NUMLOCK",
+    "K_UPPER",
+    "K_LOWER",
+    "K_SHIFT",
+    "K_SCROLL",
+}
+
+
+def parse_kmn(source: str) -> List[Rule]:
+    """
+    Parses .kmn source code into a list of rules, in order.
+    """
+    stores = {}
+    rules = []
+    for lineno, line in enumerate(source.splitlines(), start=1):
+        line = line.strip()
+        if not line or line == "c" or line.startswith("c "):
+            continue
+
+        match = _STORE.match(line)
+        if match:
+            stores[match.group("name")] = _parse_store(match.group("value"), lineno)
+            continue
+        if line.startswith(("store(", "begin ", "group(")):
+            # System stores and the (only) group are irrelevant here.
+            continue
+
+        match = _RULE.match(line)
+        if not match:
+            raise ValueError(f"line {lineno}: unsupported statement: {line}")
+        rules.extend(_parse_rule(match, stores, lineno))
+    return rules
+
+
+def _parse_store(value: str, lineno: int) -> Tuple[str, ...]:
+    """
+    Returns the items of a store: characters, or key names for [KEY] items.
+    """
+    items = []
+    for item in _ITEM.findall(value):
+        char = _CHARACTER.match(item)
+        key = _KEY.match(item)
+        if item[:1] in ("'", '"'):
+            items.extend(item[1:-1])
+        elif char:
+            items.append(chr(int(char.group(1), 16)))
+        elif key:
+            items.append(key.group("key"))
+        else:
+            raise ValueError(f"line {lineno}: unsupported store item: {item}")
+    return tuple(items)
+
+
+def _parse_rule(match, stores: Dict[str, Tuple[str, ...]], lineno: int):
+    """
+    Yields the rule, or one rule per item in the store an index() refers to.
+    """
+    context = [
+        _parse_context_item(item, stores, lineno)
+        for item in _ITEM.findall(match.group("context"))
+    ]
+    key = _KEY.match(match.group("key"))
+    # Every item on the left-hand side, as a tuple of alternatives:
+    lhs = [tuple(item) for item in context]
+    if key:
+        lhs.append((key.group("key"),))
+    else:
+        lhs.append(_store_items(match.group("key"), stores, lineno))
+
+    output = []
+    layer = None
+    indices = set()
+    for item in _ITEM.findall(match.group("output")):
+        char = _CHARACTER.match(item)
+        index = _INDEX.match(item)
+        layer_switch = _LAYER.match(item)
+        if char:
+            output.append(chr(int(char.group(1), 16)))
+        elif index:
+            store = stores[index.group("store")]
+            offset = int(index.group("offset")) - 1
+            if not 0 <= offset < len(lhs):
+                raise ValueError(f"line {lineno}: index() out of range: {item}")
+            indices.add(offset)
+            output.append((store, offset))
+        elif layer_switch:
+            layer = layer_switch.group("layer")
+        else:
+            raise ValueError(f"line {lineno}: unsupported output: {item}")
+
+    # Expand the key, and every context item that an index() refers to.
+    key_offset = len(lhs) - 1
+    expanded = [
+        offset
+        for offset in range(len(lhs))
+        if offset in indices or offset == key_offset
+    ]
+    for choice in itertools.product(*(range(len(lhs[offset])) for offset in expanded)):
+        chosen = dict(zip(expanded, choice))
+        items = [
+            lhs[offset][chosen[offset]] if offset in chosen else "".join(lhs[offset])
+            for offset in range(len(lhs))
+        ]
+        text = "".join(
+            part if isinstance(part, str) else part[0][chosen[part[1]]]
+            for part in output
+        )
+        yield Rule(tuple(items[:-1]), items[-1], text, layer)
+
+
+def _store_items(item: str, stores, lineno: int) -> Tuple[str, ...]:
+    any_store = _ANY.match(item)
+    if not any_store:
+        raise ValueError(f"line {lineno}: unsupported key: {item}")
+    return stores[any_store.group("store")]
+
+
+def _parse_context_item(item: str, stores: Dict[str, str], lineno: int) -> str:
+    char = _CHARACTER.match(item)
+    if char:
+        return chr(int(char.group(1), 16))
+    return "".join(_store_items(item, stores, lineno))
+
+
+class Keyboard:
+    """
+    A compiled keyboard: rules from a .kmn file and layers from a
+    .keyman-touch-layout file.
+
+    Keys are named either by their id (e.g., "U_1420", "K_BKSP") or by the
+    text on their label (e.g., "ᐠ"), looked up in the current layer.
+    """
+
+    def __init__(self, rules: Iterable[Rule], touch_layout: dict):
+        # key -> [(context length, {context: (output, layer)})], longest first
+        compiled = {}
+        for rule in rules:
+            by_length = compiled.setdefault(rule.key, {})
+            table = by_length.setdefault(len(rule.context), {})
+            for context in itertools.product(*rule.context):
+                # Like Keyman, the first rule that matches wins.
+                table.setdefault("".join(context), (rule.output, rule.layer))
+        self.rules = {
+            key: sorted(by_length.items(), reverse=True)
+            for key, by_length in compiled.items()
+        }
+        self.layers = _compile_layers(touch_layout)
+
+    @classmethod
+    def from_files(cls, kmn_filename: str, layout_filename: str) -> "Keyboard":
+        with open(kmn_filename, encoding="UTF-8") as kmn_file:
+            rules = parse_kmn(kmn_file.read())
+        with open(layout_filename, encoding="UTF-8") as layout_file:
+            touch_layout = json.load(layout_file)
+        return cls(rules, touch_layout)
+
+    def replay(
+        self, keys: Iterable[str], text: str = "", layer: str = "default"
+    ) -> Tuple[str, str]:
+        """
+        Presses each key in order, starting with the given text before the
+        cursor, on the given layer. Returns the resulting text and layer.
+        """
+        buffer = list(text)
+        layers = self.layers
+        rules = self.rules
+        actions = layers[layer]
+
+        for key_name in keys:
+            try:
+                action = actions[key_name]
+            except KeyError:
+                raise KeyError(f"no key {key_name!r} on layer {layer!r}") from None
+            key, output, nextlayer = action
+
+            for length, table in rules.get(key, ()):
+                if length == 1:
+                    # By far the most common case.
+                    match = table.get(buffer[-1]) if buffer else None
+                elif length == 0:
+                    match = table.get("")
+                elif length <= len(buffer):
+                    match = table.get("".join(buffer[-length:]))
+                else:
+                    continue
+                if match is None:
+                    continue
+                output, rule_layer = match
+                if length:
+                    del buffer[-length:]
+                buffer.extend(output)
+                if rule_layer is not None:
+                    nextlayer = rule_layer
+                break
+            else:
+                if key == "K_BKSP":
+                    if buffer:
+                        buffer.pop()
+                else:
+                    buffer.extend(output)
+
+            if nextlayer is not None and nextlayer != layer:
+                layer = nextlayer
+                actions = layers[layer]
+
+        return "".join(buffer), layer
+
+
+def _compile_layers(touch_layout: dict) -> Dict[str, Dict[str, _Action]]:
+    """
+    Returns, for every layer, a mapping of key names to actions.
+    """
+    layers = {}
+    for layer in touch_layout["phone"]["layer"]:
+        actions = layers[layer["id"]] = {}
+        for row in layer["row"]:
+            for key in row["key"]:
+                nextlayer = key.get("nextlayer")
+                for addressable in (key, *key.get("sk", ())):
+                    action = _Action(
+                        addressable["id"],
+                        default_output(addressable),
+                        addressable.get("nextlayer", nextlayer),
+                    )
+                    if not action.key:
+                        # Blank placeholder keys cannot be pressed.
+                        continue
+                    # The first key with a given id or label wins.
+                    actions.setdefault(action.key, action)
+                    if addressable.get("text"):
+                        actions.setdefault(addressable["text"], action)
+    return layers
+
+
+def default_output(key: dict) -> str:
+    """
+    Returns what a key of the touch layout types when no rule matches it.
+    """
+    key_id = key["id"]
+    if key_id.startswith("U_"):
+        return chr(int(key_id[2:], 16))
+    if key_id in _DEFAULT_OUTPUT:
+        return _DEFAULT_OUTPUT[key_id]
+    if key_id in _NO_OUTPUT:
+        return ""
+    # Other K_ keys (on the numeric and Latin layers) type their label.
+    return key.get("text", "")
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# Copyright © 2020 Eddie Antonio Santos <Eddie.Santos@nrc-cnrc.gc.ca>
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+A small asyncio HTTP service that generates customized keyboard builds.
+
+    GET  /nrc_crk_cans.kmn?css=yes&vowel-hack=yes&compact=no&dialect=woods
+    GET  /nrc_crk_cans.keyman-touch-layout?latin=yes&compact=no
+    POST /nrc_crk_cans.keyman-touch-layout?latin=no   (body: an ASCII art LAYOUT)
+    GET  /stats
+
+Generated files are kept in a bounded LRU cache, keyed by the artifact, the
+options it actually depends on (normalized), and the digest of
+syllabics.tsv. Generation runs on a pool of worker processes, so the event
+loop is free to answer other requests (including cache hits) meanwhile.
+Concurrent requests for the same file share one generation.
+"""
+
+import asyncio
+import json
+import statistics
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from io import StringIO
+from typing import Dict, Hashable, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from .kmn import generate_kmn
+from .orthography import orthography_for
+from .syllabics import DEFAULT_DIALECT, DIALECTS, LOAD_STATISTICS
+from .touch_layout import (
+    ASCII_KEY,
+    LAYOUTS,
+    PeriodKey,
+    SpecialKey,
+    parse_ascii_layout,
+    write_layout,
+)
+
+__all__ = ["BuildOptions", "BadRequest", "LRUCache", "KeyboardService"]
+
+KEYBOARD_NAME = "nrc_crk_cans"
+KMN = "kmn"
+TOUCH_LAYOUT = "keyman-touch-layout"
+CONTENT_TYPES = {
+    KMN: "text/plain; charset=UTF-8",
+    TOUCH_LAYOUT: "application/json; charset=UTF-8",
+}
+# A custom LAYOUT can be POSTed to generate a touch layout from it:
+ALLOWED_METHODS = {KMN: "GET", TOUCH_LAYOUT: "GET, POST"}
+
+TRUE_VALUES = {"1", "true", "yes", "on", "with"}
+FALSE_VALUES = {"0", "false", "no", "off", "without"}
+
+# Requests larger than this are refused (a LAYOUT is a few hundred bytes):
+MAX_BODY_SIZE = 16 * 1024
+# How many recent requests latency percentiles are computed over:
+LATENCY_WINDOW = 1000
+
+
+class BadRequest(ValueError):
+    """
+    Raised when a request's options are not valid.
+    """
+
+
+class BuildOptions(NamedTuple):
+    """
+    Every option of a build, normalized.
+    """
+
+    css: bool = False
+    vowel_hack: bool = False
+    latin: bool = False
+    compact: bool = False
+    dialect: str = DEFAULT_DIALECT
+    layout: str = LAYOUTS[DEFAULT_DIALECT]
+
+    @classmethod
+    def from_query(cls, query: Dict[str, str], layout: str = None) -> "BuildOptions":
+        """
+        Parses options from a query string (e.g., {"vowel-hack": "yes"}).
+        """
+        flags = {}
+        for name, value in query.items():
+            if name in ("dialect", "layout"):
+                continue
+            field = name.replace("-", "_")
+            if field not in ("css", "vowel_hack", "latin", "compact"):
+                raise BadRequest(f"unknown option: {name}")
+            flags[field] = _parse_flag(name, value)
+        dialect = query.get("dialect", DEFAULT_DIALECT)
+        if dialect not in DIALECTS:
+            raise BadRequest(f"dialect must be one of {', '.join(DIALECTS)}")
+        if layout is None:
+            layout = query.get("layout", LAYOUTS[dialect])
+        return cls(
+            **flags, dialect=dialect, layout=normalize_layout(layout, dialect)
+        )
+
+    def key_for(self, artifact: str) -> Tuple:
+        """
+        Returns the options that the given artifact depends on.
+        """
+        if artifact == KMN:
+            return (self.css, self.vowel_hack, self.compact, self.dialect)
+        return (self.latin, self.compact, self.dialect, self.layout)
+
+
+def _parse_flag(name: str, value: str) -> bool:
+    value = value.lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise BadRequest(f"{name} must be yes or no, not {value!r}")
+
+
+def normalize_layout(layout: str, dialect: str = DEFAULT_DIALECT) -> str:
+    """
+    Returns the layout with every key written the same way, so that layouts
+    that only differ in spacing share a cache entry. Raises BadRequest if the
+    layout has an unknown key, or anything that is not a key:
+
+    >>> normalize_layout("[ p ] [ t")
+    Traceback (most recent call last):
+      ...
+    libkeyboard.service.BadRequest: not a key, on line 1 of the layout: '[ t'
+    """
+    for line_number, line in enumerate(layout.strip().split("\n"), start=1):
+        leftover = ASCII_KEY.sub("", line).strip()
+        if leftover:
+            raise BadRequest(
+                f"not a key, on line {line_number} of the layout: {leftover!r}"
+            )
+
+    orthography = orthography_for(dialect)
+    rows = []
+    for row in parse_ascii_layout(layout, dialect):
+        for key in row:
+            for label in (key.label, *key.long_press):
+                if not (
+                    label in orthography.syllabics
+                    or SpecialKey.label_matches(label, orthography)
+                    or PeriodKey.label_matches(label, orthography)
+                ):
+                    raise BadRequest(f"unknown key in layout: {label!r}")
+        rows.append(
+            " ".join(f"[ {'/'.join((key.label, *key.long_press))} ]" for key in row)
+        )
+    if not any(rows):
+        raise BadRequest("the layout has no keys")
+    return "\n".join(rows)
+
+
+def generate(artifact: str, options: BuildOptions) -> bytes:
+    """
+    Generates one file. This runs in a worker process.
+    """
+    if artifact == KMN:
+        text = generate_kmn(
+            css=options.css,
+            vowel_hack=options.vowel_hack,
+            compact=options.compact,
+            dialect=options.dialect,
+        )
+    else:
+        output = StringIO()
+        write_layout(
+            output,
+            include_latin=options.latin,
+            compact=options.compact,
+            layout=options.layout,
+            dialect=options.dialect,
+        )
+        text = output.getvalue()
+    return text.encode("UTF-8")
+
+
+class LRUCache:
+    """
+    A mapping that forgets its least recently used entries beyond maxsize.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, bytes]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        try:
+            self._entries.move_to_end(key)
+        except KeyError:
+            return None
+        return self._entries[key]
+
+    def put(self, key: Hashable, value: bytes):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class _Counters:
+    def __init__(self):
+        self.requests = 0
+        self.hits = 0
+        self.misses = 0
+        # Misses that waited for a generation another request started:
+        self.shared = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.generation_times = deque(maxlen=LATENCY_WINDOW)
+
+
+def _summarize(seconds) -> dict:
+    if not seconds:
+        return {}
+    ordered = sorted(seconds)
+    summary = {
+        "mean": statistics.mean(ordered),
+        "p50": ordered[len(ordered) // 2],
+        "p95": ordered[min(len(ordered) - 1, (95 * len(ordered)) // 100)],
+        "max": ordered[-1],
+    }
+    # In milliseconds:
+    return {name: round(value * 1000, 3) for name, value in summary.items()}
+
+
+class KeyboardService:
+    """
+    Serves generated files over HTTP/1.1 (one request per connection).
+    """
+
+    def __init__(self, cache_size: int = 128, executor: Executor = None):
+        self.cache = LRUCache(cache_size)
+        self.executor = executor or ProcessPoolExecutor()
+        self.counters = _Counters()
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+
+    async def artifact(self, artifact: str, options: BuildOptions) -> Tuple[bytes, str]:
+        """
+        Returns the file and how it was obtained ("hit", "miss", or "shared").
+        """
+        key = (artifact, options.key_for(artifact), LOAD_STATISTICS.digest)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.counters.hits += 1
+            return cached, "hit"
+
+        self.counters.misses += 1
+        if key in self._in_flight:
+            self.counters.shared += 1
+            return await asyncio.shield(self._in_flight[key]), "shared"
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, generate, artifact, options)
+        self._in_flight[key] = future
+        start = time.perf_counter()
+        try:
+            content = await future
+        finally:
+            del self._in_flight[key]
+        self.counters.generation_times.append(time.perf_counter() - start)
+        self.cache.put(key, content)
+        return content, "miss"
+
+    def statistics(self) -> dict:
+        counters = self.counters
+        lookups = counters.hits + counters.misses
+        return {
+            "requests": counters.requests,
+            "hits": counters.hits,
+            "misses": counters.misses,
+            "shared": counters.shared,
+            "errors": counters.errors,
+            "hit_rate": counters.hits / lookups if lookups else 0.0,
+            "cached": len(self.cache),
+            "cache_size": self.cache.maxsize,
+            "latency_ms": _summarize(counters.latencies),
+            "generation_ms": _summarize(counters.generation_times),
+            "syllabics_digest": LOAD_STATISTICS.digest,
+        }
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        start = time.perf_counter()
+        self.counters.requests += 1
+        try:
+            status, headers, body = await self._respond(reader)
+        except BadRequest as error:
+            status, headers, body = 400, {}, f"{error}\n".encode("UTF-8")
+        except Exception as error:
+            status, headers, body = 500, {}, f"{error!r}\n".encode("UTF-8")
+        if status >= 400:
+            self.counters.errors += 1
+            headers.setdefault("Content-Type", "text/plain; charset=UTF-8")
+
+        writer.write(f"HTTP/1.1 {status} {_REASONS[status]}\r\n".encode("ascii"))
+        headers.update({"Content-Length": str(len(body)), "Connection": "close"})
+        for name, value in headers.items():
+            writer.write(f"{name}: {value}\r\n".encode("ascii"))
+        writer.write(b"\r\n")
+        writer.write(body)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+        self.counters.latencies.append(time.perf_counter() - start)
+
+    async def _respond(self, reader: asyncio.StreamReader):
+        try:
+            request_line = await reader.readline()
+            method, target, _version = request_line.decode("ascii").split()
+        except ValueError:
+            raise BadRequest("malformed request line")
+        request_headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            request_headers[name.strip().lower()] = value.strip()
+
+        url = urlsplit(target)
+        query = dict(parse_qsl(url.query))
+        if url.path == "/stats" and method == "GET":
+            body = json.dumps(self.statistics(), indent=2) + "\n"
+            return 200, {"Content-Type": "application/json"}, body.encode("UTF-8")
+
+        for artifact in (KMN, TOUCH_LAYOUT):
+            if url.path == f"/{KEYBOARD_NAME}.{artifact}":
+                break
+        else:
+            return 404, {}, b"not found\n"
+
+        layout = None
+        if method == "POST" and artifact == TOUCH_LAYOUT:
+            try:
+                length = int(request_headers.get("content-length", 0))
+            except ValueError:
+                raise BadRequest("malformed Content-Length")
+            if length < 0:
+                raise BadRequest("malformed Content-Length")
+            if length > MAX_BODY_SIZE:
+                return 413, {}, b"layout too large\n"
+            try:
+                layout = (await reader.readexactly(length)).decode("UTF-8")
+            except asyncio.IncompleteReadError:
+                raise BadRequest("request body is shorter than its Content-Length")
+            except UnicodeDecodeError:
+                raise BadRequest("request body is not UTF-8")
+        elif method != "GET":
+            return 405, {"Allow": ALLOWED_METHODS[artifact]}, b"method not allowed\n"
+
+        options = BuildOptions.from_query(query, layout)
+        content, how = await self.artifact(artifact, options)
+        return 200, {"Content-Type": CONTENT_TYPES[artifact], "X-Cache": how}, content
+
+    async def serve(self, host: str, port: int):
+        server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
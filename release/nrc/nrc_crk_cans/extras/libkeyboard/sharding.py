@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# Copyright © 2020 Eddie Antonio Santos <Eddie.Santos@nrc-cnrc.gc.ca>
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Processes large text files in parallel, one shard per worker process.
+
+Files are split into shards at line boundaries. Each worker process imports
+the module of the function applied to the shards (and with it, the
+syllabics table) once, when it starts, and results are handed back in the
+original order. Only a few shards are ever in flight at a time, so peak
+memory is bounded by the shard size and the number of workers, not the size
+of the file.
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterator, List, NamedTuple, Tuple
+
+# Roughly how many bytes each shard should contain.
+DEFAULT_SHARD_SIZE = 8 << 20
+
+
+class ShardResult(NamedTuple):
+    """
+    The result of processing a single shard, and how long it took.
+    """
+
+    index: int
+    value: Any
+    bytes_read: int
+    seconds: float
+
+
+def find_shards(
+    filename: str, shard_size: int = DEFAULT_SHARD_SIZE
+) -> List[Tuple[int, int]]:
+    """
+    Returns (start, end) byte offsets that split the file into shards of
+    about shard_size bytes each. Every shard ends just after a newline (or
+    at the end of the file), so no line (nor UTF-8 character) is ever split
+    between two shards.
+    """
+    size = os.path.getsize(filename)
+    shards = []
+    with open(filename, "rb") as file:
+        start = 0
+        while start < size:
+            file.seek(min(start + shard_size, size))
+            file.readline()
+            end = min(file.tell(), size)
+            shards.append((start, end))
+            start = end
+    return shards
+
+
+def report_throughput(label: str, byte_count: int, seconds: float):
+    """
+    Prints how many megabytes were processed, and how fast, on stderr.
+    """
+    megabytes = byte_count / 1e6
+    print(
+        f"{label}{megabytes:.2f} MB in {seconds:.2f} s "
+        f"({megabytes / max(seconds, 1e-9):.2f} MB/s)",
+        file=sys.stderr,
+    )
+
+
+def _load_worker(module_name: str):
+    # Importing the module builds the syllabics table in this process, once.
+    __import__(module_name)
+
+
+def _process_shard(
+    index: int, filename: str, start: int, end: int, function: Callable[[str], Any]
+) -> ShardResult:
+    began = time.perf_counter()
+    with open(filename, "rb") as file:
+        file.seek(start)
+        data = file.read(end - start)
+    value = function(data.decode("UTF-8"))
+    return ShardResult(index, value, len(data), time.perf_counter() - began)
+
+
+def map_shards(
+    filename: str,
+    function: Callable[[str], Any],
+    jobs: int = None,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+) -> Iterator[ShardResult]:
+    """
+    Applies function() to the text of every shard of the file on a pool of
+    worker processes, yielding the results in file order.
+
+    function must be picklable (e.g., a module-level function, or a
+    functools.partial of one) and must accept any sequence of whole lines.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    module_name = getattr(function, "func", function).__module__
+    shards = find_shards(filename, shard_size)
+    # Keep every worker busy, but never hold more than this many shards:
+    max_in_flight = 2 * jobs
+
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=_load_worker, initargs=(module_name,)
+    ) as executor:
+        in_flight = []
+        next_shard = 0
+        while next_shard < len(shards) or in_flight:
+            while next_shard < len(shards) and len(in_flight) < max_in_flight:
+                start, end = shards[next_shard]
+                in_flight.append(
+                    executor.submit(
+                        _process_shard, next_shard, filename, start, end, function
+                    )
+                )
+                next_shard += 1
+            # Wait for the oldest shard, so that results stay in order.
+            yield in_flight.pop(0).result()
@@ -9,18 +9,55 @@
 
 """
 A mapping between SRO syllables and syllabics.
+
+SYLLABICS has the syllabics of Plains Cree. The tables of the other
+dialects in syllabics.tsv (DIALECTS) are built the first time they are
+asked for with syllabics_for(), from the same rows:
+
+    >>> "thi" in syllabics_for("woods")
+    True
 """
 
-import csv
-from pathlib import Path
+import io
+import marshal
+import os
+import time
+from array import array
+from functools import lru_cache
 from types import MappingProxyType
-from typing import NamedTuple
+from typing import Mapping, NamedTuple
+
+__all__ = [
+    "DIALECTS",
+    "LOAD_STATISTICS",
+    "SYLLABICS",
+    "SYLLABICS_BY_CODEPOINT",
+    "syllabics_for",
+]
+# os.path rather than pathlib, since importing pathlib costs more than
+# loading the cached table:
+here = os.path.dirname(os.path.abspath(__file__))
 
-__all__ = ["SYLLABICS"]
-here = Path(__file__).parent
+TSV_PATH = os.path.join(here, "syllabics.tsv")
+# The parsed TSV is cached here, with the TSV's mtime, size, and SHA-256:
+CACHE_PATH = os.path.join(here, "__pycache__", "syllabics.tsv.marshal")
+# Bump this whenever the layout of the cache changes:
+CACHE_VERSION = 2
+# If this environment variable names a file, a line is appended to it every
+# time the table is loaded. Handy for measuring cold starts in batch jobs.
+LOAD_LOG_VARIABLE = "LIBKEYBOARD_LOAD_LOG"
 
 VOWELS = "êioaîôâ"
 
+# The dialect of SYLLABICS:
+DEFAULT_DIALECT = "plains"
+
+# The dense table spans the Unified Canadian Aboriginal Syllabics block
+# (U+1400–U+167F) and its extension (U+18B0–U+18FF), since a few Plains Cree
+# syllabics (nwi, nwî, nwo, nwô) live in the latter.
+BLOCK_START = 0x1400
+BLOCK_END = 0x18FF
+
 
 class Syllabic(NamedTuple):
     """
@@ -48,30 +85,24 @@ class Syllabic(NamedTuple):
 
     @property
     def type(self):
-        if len(self.sro) == 1:
-            if self.sro in VOWELS:
-                return "vowel"
-            else:
-                return "consonant"
-        elif self.sro == "hk":
-            return "consonant"
-        else:
-            return "syllable"
+        return self._record.type
 
     @property
     def prefix(self):
-        naive_prefix = self.sro.rstrip(VOWELS)
-        if naive_prefix == self.sro:
-            return ""
-        return naive_prefix
+        return self._record.prefix
 
     @property
     def vowel(self):
-        if self.type == "syllable":
-            return self.sro[-1]
-        elif self.type == "vowel":
-            return self.sro
-        raise ValueError(f"no vowel in {self}")
+        vowel = self._record.vowel
+        if not vowel:
+            raise ValueError(f"no vowel in {self}")
+        return vowel
+
+    @property
+    def _record(self):
+        # Syllabics that are not in Plains Cree are classified every time.
+        record = SYLLABICS_BY_CODEPOINT.get(self.scalar_value)
+        return record or _Classification(*_classify(self.sro))
 
     @classmethod
     def from_tsv(cls, row):
@@ -80,6 +111,206 @@ class Syllabic(NamedTuple):
         )
 
 
+class SyllabicRecord:
+    """
+    Everything derived from a single syllabic, computed once.
+
+    ``id`` is a dense integer from 0 to len(SYLLABICS) - 1, suitable for
+    indexing arrays.
+    """
+
+    __slots__ = (
+        "id",
+        "cans",
+        "sro",
+        "scalar_value",
+        "key_code",
+        "type",
+        "prefix",
+        "vowel",
+    )
+
+    def __init__(self, id, syllabic):
+        self.id = id
+        self.cans = syllabic.cans
+        self.sro = syllabic.sro
+        self.scalar_value = syllabic.scalar_value
+        self.key_code = syllabic.key_code
+        self.type, self.prefix, self.vowel = _classify(syllabic.sro)
+
+    def __repr__(self):
+        cls = type(self).__name__
+        return f"<{cls} {self.id} {self.cans} {self.sro!r} {self.type}>"
+
+
+class CodepointTable:
+    """
+    Constant-time lookup of syllabics by code point.
+
+    The table is array-backed: ``records`` has one slot per code point from
+    BLOCK_START to BLOCK_END (None where there is no syllabic), and ``ids`` is
+    the parallel array of dense IDs (-1 where there is no syllabic). Lookups
+    return the same preallocated record every time.
+    """
+
+    __slots__ = ("records", "ids", "by_id")
+
+    def __init__(self, syllabics):
+        self.by_id = tuple(
+            SyllabicRecord(id, syllabic) for id, syllabic in enumerate(syllabics)
+        )
+        records = [None] * (BLOCK_END - BLOCK_START + 1)
+        ids = array("h", [-1]) * len(records)
+        for record in self.by_id:
+            offset = record.scalar_value - BLOCK_START
+            records[offset] = record
+            ids[offset] = record.id
+        self.records = tuple(records)
+        self.ids = ids
+
+    def __getitem__(self, codepoint: int) -> SyllabicRecord:
+        record = self.get(codepoint)
+        if record is None:
+            raise KeyError(codepoint)
+        return record
+
+    def __contains__(self, codepoint: int) -> bool:
+        return self.get(codepoint) is not None
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def get(self, codepoint: int, default=None):
+        offset = codepoint - BLOCK_START
+        if 0 <= offset < len(self.records):
+            record = self.records[offset]
+            if record is not None:
+                return record
+        return default
+
+    def id_of(self, character: str) -> int:
+        """
+        Returns the dense ID of the given character, or -1 if it is not a
+        syllabic.
+        """
+        offset = ord(character) - BLOCK_START
+        if 0 <= offset < len(self.ids):
+            return self.ids[offset]
+        return -1
+
+
+def _classify(sro):
+    """
+    Returns the type, prefix, and vowel of an SRO syllable.
+    """
+    if len(sro) == 1:
+        if sro in VOWELS:
+            type_ = "vowel"
+        else:
+            type_ = "consonant"
+    elif not sro.endswith(tuple(VOWELS)):
+        # e.g., hk, th
+        type_ = "consonant"
+    else:
+        type_ = "syllable"
+
+    naive_prefix = sro.rstrip(VOWELS)
+    prefix = "" if naive_prefix == sro else naive_prefix
+
+    if type_ == "syllable":
+        vowel = sro[-1]
+    elif type_ == "vowel":
+        vowel = sro
+    else:
+        vowel = ""
+
+    return type_, prefix, vowel
+
+
+class _Classification(NamedTuple):
+    type: str
+    prefix: str
+    vowel: str
+
+
+class LoadStatistics(NamedTuple):
+    """
+    How the syllabics table was loaded on import.
+    """
+
+    # Either "cache" or "tsv"
+    source: str
+    # Wall-clock time spent loading the table
+    seconds: float
+    # SHA-256 of syllabics.tsv
+    digest: str
+
+
+def _read_rows():
+    """
+    Returns the rows of the syllabics TSV file as a list of dictionaries, and
+    how they were obtained.
+
+    Like a .pyc file, the cache records the modification time and size of
+    the TSV it was built from: if they have not changed, the TSV is not even
+    read. Otherwise, the TSV is hashed, and parsing is still avoided if its
+    content has not changed (e.g., after a fresh checkout). Only then is the
+    TSV parsed, and the cache (re)written.
+    """
+    stat = os.stat(TSV_PATH)
+    signature = [stat.st_mtime_ns, stat.st_size]
+
+    cached = None
+    try:
+        # marshal.loads() of the whole file; marshal.load() reads it in tiny
+        # pieces, which is ten times slower.
+        with open(CACHE_PATH, "rb") as cache_file:
+            cache = cache_file.read()
+        version, cached_signature, cached_digest, rows = marshal.loads(cache)
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+    else:
+        if version == CACHE_VERSION:
+            if cached_signature == signature:
+                return rows, "cache", cached_digest
+            cached = cached_digest, rows
+
+    # Only imported when the cache is stale, since they are slow to import:
+    import csv
+    import hashlib
+
+    with open(TSV_PATH, "rb") as tsv_file:
+        data = tsv_file.read()
+    digest = hashlib.sha256(data).hexdigest()
+    if cached and cached[0] == digest:
+        rows = cached[1]
+        _write_cache(signature, digest, rows)
+        return rows, "cache", digest
+
+    syllabics_file = io.StringIO(data.decode("UTF-8"), newline="")
+    rows = list(csv.DictReader(syllabics_file, delimiter="\t"))
+    _write_cache(signature, digest, rows)
+    return rows, "tsv", digest
+
+
+def _write_cache(signature, digest, rows):
+    """
+    Atomically writes the cache. Failure is not an error: the table will
+    simply be parsed again next time (e.g., on a read-only install).
+    """
+    temporary_path = f"{CACHE_PATH}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+        with open(temporary_path, "wb") as cache_file:
+            cache_file.write(marshal.dumps((CACHE_VERSION, signature, digest, rows)))
+        os.replace(temporary_path, CACHE_PATH)
+    except OSError:
+        try:
+            os.unlink(temporary_path)
+        except OSError:
+            pass
+
+
 def _parse_syllabics():
     """
     Parse the syllabics TSV file.
@@ -87,18 +318,62 @@ def _parse_syllabics():
     This file should be obtained at:
     https://github.com/UAlbertaALTLab/nehiyawewin-syllabics/blob/master/syllabics.tsv
     """
+    start = time.perf_counter()
+    rows, source, digest = _read_rows()
+    syllabics = _select_dialect(rows, DEFAULT_DIALECT)
+    statistics = LoadStatistics(source, time.perf_counter() - start, digest)
+    _log_load(statistics)
+    return rows, syllabics, statistics
+
+
+def _select_dialect(rows, dialect):
+    column = f"in.{dialect}.cree"
     syllabics = {}
-    with open(here / "syllabics.tsv", encoding="UTF-8") as syllabics_file:
-        syllabics_tsv = csv.DictReader(syllabics_file, delimiter="\t")
-        for row in syllabics_tsv:
-            if row["in.plains.cree"] != "TRUE":
-                continue
-            syllabic = Syllabic.from_tsv(row)
-            assert syllabic.sro not in syllabics
-            syllabics[syllabic.sro] = syllabic
+    for row in rows:
+        if row[column] != "TRUE":
+            continue
+        syllabic = Syllabic.from_tsv(row)
+        assert syllabic.sro not in syllabics
+        syllabics[syllabic.sro] = syllabic
     return syllabics
 
 
+def _log_load(statistics):
+    log_filename = os.environ.get(LOAD_LOG_VARIABLE)
+    if not log_filename:
+        return
+    with open(log_filename, "a", encoding="UTF-8") as log_file:
+        print(statistics.source, f"{statistics.seconds:.6f}", sep="\t", file=log_file)
+
+
+_rows, _syllabics, LOAD_STATISTICS = _parse_syllabics()
+
+# Every dialect with an in.DIALECT.cree column, e.g., ("plains", "woods", ...)
+DIALECTS = tuple(
+    column[len("in.") : -len(".cree")]
+    for column in (_rows[0] if _rows else ())
+    if column.startswith("in.") and column.endswith(".cree")
+)
+
 # Create a global lookup table that converts an SRO sequence to a syllabic.
 # Note: using MappingProxyType makes this table **read-only**.
-SYLLABICS = MappingProxyType(_parse_syllabics())
+SYLLABICS = MappingProxyType(_syllabics)
+del _syllabics
+
+
+@lru_cache(maxsize=None)
+def syllabics_for(dialect: str = DEFAULT_DIALECT) -> Mapping[str, Syllabic]:
+    """
+    Returns the read-only table of syllabics (SRO -> Syllabic) of a dialect.
+    Each table is built the first time it is needed, from the rows that were
+    loaded on import.
+    """
+    if dialect == DEFAULT_DIALECT:
+        return SYLLABICS
+    if dialect not in DIALECTS:
+        raise ValueError(f"unknown dialect: {dialect!r} (expected one of {DIALECTS})")
+    return MappingProxyType(_select_dialect(_rows, dialect))
+
+
+# Reverse lookup: code point -> precomputed syllabic record.
+SYLLABICS_BY_CODEPOINT = CodepointTable(SYLLABICS.values())
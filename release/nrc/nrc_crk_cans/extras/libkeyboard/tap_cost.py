@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# Copyright © 2020 Eddie Antonio Santos <Eddie.Santos@nrc-cnrc.gc.ca>
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Measures how many taps it takes to type text on a touch layout.
+
+The minimal tap sequence for every character is found with a breadth-first
+search over the layer graph of the touch layout, starting at the default
+layer: layers are nodes, and keys with a nextlayer are edges. E.g., ᑿ is
+typed as ᐠ (to the kV layer), ᐤ (to the kwV layer), then ᑿ.
+
+Every character is costed as if it were typed from the default layer. This
+is exact for well-formed syllabics text, since every syllabic layer has the
+same consonant, space, and punctuation keys as the default layer; the only
+exception (a final followed by a standalone vowel) is not valid orthography.
+"""
+
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+# Words are whitespace-separated, so that untypeable characters are counted:
+from .corpus import count_words
+
+__all__ = ["Tap", "minimal_tap_sequences", "TapCostReport", "analyze", "count_words"]
+
+# Selecting a key from a long-press menu takes a press, and then a slide.
+LONG_PRESS_COST = 2
+
+
+class Tap(NamedTuple):
+    """
+    A single tap on the touch layout.
+    """
+
+    layer: str
+    key_id: str
+    label: str
+    long_press: bool = False
+
+    @property
+    def cost(self) -> int:
+        return LONG_PRESS_COST if self.long_press else 1
+
+    def __str__(self) -> str:
+        return f"⋯{self.label}" if self.long_press else self.label
+
+
+def minimal_tap_sequences(touch_layout: dict) -> Dict[str, Tuple[Tap, ...]]:
+    """
+    Returns the cheapest sequence of taps that types each character that can
+    be typed on the layout.
+    """
+    layers = {layer["id"]: layer for layer in touch_layout["phone"]["layer"]}
+
+    # Breadth-first search for the shortest path to each layer.
+    path_to = {"default": ()}
+    queue = deque(["default"])
+    while queue:
+        layer_id = queue.popleft()
+        for key, _parent in _keys_in(layers[layer_id]):
+            nextlayer = key.get("nextlayer")
+            if nextlayer in layers and nextlayer not in path_to:
+                path_to[nextlayer] = path_to[layer_id] + (_tap(layer_id, key),)
+                queue.append(nextlayer)
+
+    sequences = {}
+    for layer_id, path in path_to.items():
+        for key, parent in _keys_in(layers[layer_id]):
+            char = _output_of(key)
+            if not char:
+                continue
+            sequence = path + (_tap(layer_id, key, long_press=parent is not None),)
+            if char not in sequences or _cost(sequence) < _cost(sequences[char]):
+                sequences[char] = sequence
+    return sequences
+
+
+def _keys_in(layer: dict):
+    """
+    Yields every key in a layer, including keys in long-press menus, along
+    with the key it pops up from (if any).
+    """
+    for row in layer["row"]:
+        for key in row["key"]:
+            yield key, None
+            for subkey in key.get("sk", ()):
+                yield subkey, key
+
+
+def _tap(layer_id: str, key: dict, long_press: bool = False) -> Tap:
+    return Tap(layer_id, key["id"], key.get("text") or key["id"], long_press)
+
+
+def _output_of(key: dict) -> str:
+    """
+    Returns the single character this key types, or "" if it types nothing
+    (or something other than one character).
+    """
+    key_id = key["id"]
+    if key_id.startswith("U_"):
+        return chr(int(key_id[2:], 16))
+    if key_id == "K_SPACE":
+        return " "
+    if key_id.startswith("K_") and len(key.get("text", "")) == 1:
+        return key["text"]
+    return ""
+
+
+def _cost(sequence: Iterable[Tap]) -> int:
+    return sum(tap.cost for tap in sequence)
+
+
+class TapCostReport(NamedTuple):
+    """
+    The tap costs of a corpus.
+    """
+
+    # Taps spent on each character (cost * frequency)
+    taps_by_character: Dict[str, int]
+    # Occurrences of each character
+    character_counts: Dict[str, int]
+    # Characters that cannot be typed at all, and their frequencies
+    untypeable: Dict[str, int]
+    # The number of word tokens (each is followed by one tap on space)
+    word_count: int
+    total_taps: int
+
+    @property
+    def total_characters(self) -> int:
+        return sum(self.character_counts.values())
+
+    def most_expensive(self, n: int) -> List[Tuple[str, int]]:
+        """
+        The n characters that cost the most taps overall.
+        """
+        return sorted(self.taps_by_character.items(), key=lambda item: -item[1])[:n]
+
+
+def analyze(
+    word_frequencies: Dict[str, int], sequences: Dict[str, Tuple[Tap, ...]]
+) -> TapCostReport:
+    """
+    Computes tap costs from a word -> frequency table.
+
+    All of the work is done once per distinct word (weighted by its
+    frequency), rather than once per token in the corpus.
+    """
+    cost_of = {char: _cost(sequence) for char, sequence in sequences.items()}
+    space_cost = cost_of.get(" ", 1)
+
+    character_counts = {}
+    untypeable = {}
+    word_count = 0
+    for word, frequency in word_frequencies.items():
+        word_count += frequency
+        for char in set(word):
+            occurrences = word.count(char) * frequency
+            if char in cost_of:
+                character_counts[char] = character_counts.get(char, 0) + occurrences
+            else:
+                untypeable[char] = untypeable.get(char, 0) + occurrences
+
+    taps_by_character = {
+        char: count * cost_of[char] for char, count in character_counts.items()
+    }
+    total_taps = sum(taps_by_character.values()) + word_count * space_cost
+    return TapCostReport(
+        taps_by_character, character_counts, untypeable, word_count, total_taps
+    )
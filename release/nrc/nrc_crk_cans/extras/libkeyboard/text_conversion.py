@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# Copyright © 2020 Eddie Antonio Santos <Eddie.Santos@nrc-cnrc.gc.ca>
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Building blocks shared by the text converters (transliteration.py and
+composition.py).
+
+A set of sequences to replace is compiled into a trie, and the trie into a
+single regular expression that prefers the longest match, so that all of the
+matching happens in the regex engine. Each node of the trie is a dict from
+characters to child nodes; a node that ends a sequence also maps TERMINAL to
+a regex guard that must match after it (usually "").
+"""
+
+import re
+
+__all__ = ["TERMINAL", "MemoizedConverter", "trie_to_regex"]
+
+# Marks that a trie node is the end of a sequence.
+TERMINAL = ""
+
+
+def trie_to_regex(node: dict) -> str:
+    """
+    Converts a trie into an equivalent regular expression that prefers the
+    longest match.
+    """
+    leaf_chars = []
+    branches = []
+    for char in sorted(c for c in node if c != TERMINAL):
+        child = node[char]
+        if list(child) == [TERMINAL] and not child[TERMINAL]:
+            leaf_chars.append(re.escape(char))
+        else:
+            branches.append(re.escape(char) + trie_to_regex(child))
+
+    if len(leaf_chars) == 1:
+        branches.append(leaf_chars[0])
+    elif leaf_chars:
+        branches.append(f"[{''.join(leaf_chars)}]")
+
+    if not branches:
+        return node.get(TERMINAL, "")
+
+    alternation = "|".join(branches)
+    if TERMINAL not in node:
+        return alternation if len(branches) == 1 else f"(?:{alternation})"
+    # Try the longer match first; fall back to stopping at this node.
+    guard = node[TERMINAL]
+    if guard:
+        return f"(?:{alternation}|{guard})"
+    return f"(?:{alternation})?"
+
+
+class MemoizedConverter:
+    """
+    Converts text one space-separated word at a time, remembering the
+    conversion of each word. The cache is cleared when it fills up so that
+    memory stays bounded on huge, diverse inputs.
+    """
+
+    MAX_CACHED_WORDS = 1 << 16
+
+    __slots__ = ("convert_uncached", "cache")
+
+    def __init__(self, convert_uncached):
+        self.convert_uncached = convert_uncached
+        self.cache = {}
+
+    def __call__(self, text: str) -> str:
+        lookup = self.cache.get
+        convert = self.convert_word
+        return " ".join([lookup(word) or convert(word) for word in text.split(" ")])
+
+    def convert_word(self, word: str) -> str:
+        result = self.convert_uncached(word)
+        if len(self.cache) >= self.MAX_CACHED_WORDS:
+            self.cache.clear()
+        self.cache[word] = result
+        return result
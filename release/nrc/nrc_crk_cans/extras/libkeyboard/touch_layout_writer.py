@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# Copyright © 2020 Eddie Antonio Santos <Eddie.Santos@nrc-cnrc.gc.ca>
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Writes .keyman-touch-layout JSON one layer at a time.
+
+In compact mode, the JSON has no whitespace, and key attributes that are
+equal to KeymanWeb's defaults are left out. The touch layout ships inside
+the compiled keyboard, so every byte saved here is a byte less for phones to
+download and parse.
+"""
+
+import json
+from typing import IO, Iterable, List, NamedTuple
+
+__all__ = ["LayerSize", "write_touch_layout"]
+
+# Key attributes that KeymanWeb assumes when they are missing:
+DEFAULT_KEY_ATTRIBUTES = {
+    "sp": {"0"},  # a normal key
+    "width": {"100", ""},  # one key wide
+}
+
+
+class LayerSize(NamedTuple):
+    """
+    How many bytes a layer occupies in the written file.
+    """
+
+    layer_id: str
+    size: int
+
+
+def write_touch_layout(
+    phone_layout: dict, layers: Iterable[dict], file: IO[str], compact: bool = False
+) -> List[LayerSize]:
+    """
+    Writes {"phone": phone_layout} to file, with the layers taken from the
+    given iterable, as they are produced. Returns the size of each layer.
+
+    phone_layout must have a "layer" entry; its value is ignored.
+    """
+    if compact:
+        encode = _compact_encoder().encode
+        item_separator = ","
+        before_layers, after_layers = _split_around_layers(phone_layout, encode)
+    else:
+        encoder = json.JSONEncoder(indent=2, ensure_ascii=False)
+        item_separator = ",\n"
+        before_layers, after_layers = _split_around_layers(
+            phone_layout, encoder.encode
+        )
+
+        # Indent each layer to its depth in the whole document.
+        def encode(layer):
+            return encoder.encode(layer).replace("\n", "\n      ")
+
+    sizes = []
+    file.write(before_layers)
+    for index, layer in enumerate(layers):
+        if compact:
+            layer = _without_defaults(layer)
+        text = encode(layer)
+        if index > 0:
+            file.write(item_separator)
+        if not compact:
+            text = "      " + text
+        file.write(text)
+        sizes.append(LayerSize(layer["id"], len(text.encode("UTF-8"))))
+    file.write(after_layers)
+    file.write("\n")
+    return sizes
+
+
+def _compact_encoder() -> json.JSONEncoder:
+    return json.JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+
+
+def _split_around_layers(phone_layout: dict, encode):
+    """
+    Encodes the document with a placeholder for the layers, and returns the
+    text before and after the placeholder.
+    """
+    placeholder = "\0LAYERS\0"
+    document = encode({"phone": {**phone_layout, "layer": [placeholder]}})
+    before, after = document.split(json.dumps(placeholder))
+    if before.endswith("\n      "):
+        # Indented mode: each layer brings its own indentation.
+        before = before[: -len("      ")]
+    return before, after
+
+
+def _without_defaults(layer: dict) -> dict:
+    """
+    Returns a copy of the layer with default key attributes removed.
+    """
+    return {
+        **layer,
+        "row": [
+            {**row, "key": [_key_without_defaults(key) for key in row["key"]]}
+            for row in layer["row"]
+        ],
+    }
+
+
+def _key_without_defaults(key: dict) -> dict:
+    compacted = {}
+    for attribute, value in key.items():
+        if attribute == "sk":
+            value = [_key_without_defaults(subkey) for subkey in value]
+        elif value in DEFAULT_KEY_ATTRIBUTES.get(attribute, ()):
+            continue
+        compacted[attribute] = value
+    return compacted
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# Copyright © 2020 Eddie Antonio Santos <Eddie.Santos@nrc-cnrc.gc.ca>
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Transliterates running text between SRO and syllabics using SYLLABICS.
+
+SRO -> syllabics is a longest-match tokenization. The SRO keys of SYLLABICS
+are compiled into a trie, and the trie is compiled into a single regular
+expression so that all of the matching happens in the regex engine rather
+than one dict probe per character in Python. On top of that, the result for
+each space-separated word is memoized: natural language text repeats the
+same words over and over, so most words are never tokenized at all.
+
+Syllabics -> SRO is a pure per-code-point mapping, so it is done with a
+precomputed str.translate() table: the lookup loop runs entirely in C and
+the output is built without any per-character Python strings. Words are
+memoized in this direction too.
+"""
+
+import codecs
+import re
+from typing import BinaryIO, Iterable, Iterator
+
+from .syllabics import SYLLABICS, SYLLABICS_BY_CODEPOINT, VOWELS
+from .text_conversion import TERMINAL, MemoizedConverter, trie_to_regex
+
+__all__ = [
+    "sro2syllabics",
+    "sro2syllabics_stream",
+    "syllabics2sro",
+    "syllabics2sro_stream",
+    "read_text_chunks",
+]
+
+# How many characters to decode at a time when streaming files.
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+# Folds the ways people commonly write SRO into the forms used by SYLLABICS:
+# capitals, macrons instead of circumflexes, and "e" without a circumflex
+# (Plains Cree only has a long ê).
+_SRO_NORMALIZATION = {
+    **{ord(c.upper()): c for sro in SYLLABICS for c in sro},
+    **{ord(macron): circumflex for macron, circumflex in zip("āēīōĀĒĪŌ", "âêîôâêîô")},
+    **{ord(c): "ê" for c in "eEÊ"},
+}
+
+# A multi-letter consonant (i.e., "hk") must not steal the first letter of
+# the following syllable: "hka" is ᐦᑲ, not ᕽᐊ.
+_CLUSTER_GUARD = f"(?![{VOWELS}]|w[{VOWELS}])"
+
+
+def _build_trie(keys: Iterable[str]) -> dict:
+    trie = {}
+    for key in keys:
+        node = trie
+        for char in key:
+            node = node.setdefault(char, {})
+        is_cluster = len(key) > 1 and SYLLABICS[key].type == "consonant"
+        node[TERMINAL] = _CLUSTER_GUARD if is_cluster else ""
+    return trie
+
+
+_SRO_TOKEN = re.compile(trie_to_regex(_build_trie(SYLLABICS)))
+_SRO_TO_CANS = {sro: syllabic.cans for sro, syllabic in SYLLABICS.items()}
+
+# No SRO token spans whitespace, so text is always split after whitespace
+# when streaming. Failing that, since every SRO token ends with a vowel or
+# consists only of consonants, it is safe to split text just before the
+# trailing run of consonants.
+_CONSONANT_LETTERS = "".join(
+    sorted(
+        {c for sro in SYLLABICS for c in sro if c not in VOWELS}
+        | {chr(c) for c, n in _SRO_NORMALIZATION.items() if n not in VOWELS}
+    )
+)
+_UNFINISHED_TAIL = re.compile(f"[{_CONSONANT_LETTERS}]*\\Z")
+# Never hold back more than this many characters between chunks.
+_MAX_PENDING = 4096
+
+
+def _replace_token(match, lookup=_SRO_TO_CANS.__getitem__):
+    return lookup(match.group())
+
+
+def _tokenize_sro(text: str) -> str:
+    return _SRO_TOKEN.sub(_replace_token, text.translate(_SRO_NORMALIZATION))
+
+
+_sro2syllabics = MemoizedConverter(_tokenize_sro)
+
+
+def sro2syllabics(text: str) -> str:
+    """
+    Converts SRO text into syllabics. Anything that is not SRO (punctuation,
+    whitespace, other scripts) is left as-is.
+
+    >>> sro2syllabics("nêhiyawêwin")
+    'ᓀᐦᐃᔭᐍᐏᐣ'
+    >>> sro2syllabics("Maskihkiy")
+    'ᒪᐢᑭᐦᑭᐩ'
+    """
+    return _sro2syllabics(text)
+
+
+def sro2syllabics_stream(chunks: Iterable[str]) -> Iterator[str]:
+    """
+    Converts an iterable of SRO text chunks into syllabics chunks.
+
+    Chunks may be split anywhere, even in the middle of a syllable; at most
+    a short run of trailing consonants is held back between chunks, so
+    memory use is bounded by the chunk size.
+    """
+    pending = ""
+    for chunk in chunks:
+        text = pending + chunk
+        cut = max(text.rfind(" "), text.rfind("\n")) + 1
+        if len(text) - cut > _MAX_PENDING:
+            start = len(text) - _MAX_PENDING
+            cut = _UNFINISHED_TAIL.search(text, start).start()
+            if cut == start:
+                cut = len(text)
+        pending = text[cut:]
+        if cut:
+            yield sro2syllabics(text[:cut])
+    if pending:
+        yield sro2syllabics(pending)
+
+
+# Code point -> SRO, for every syllabic in SYLLABICS.
+_CANS_TO_SRO = {
+    record.scalar_value: record.sro for record in SYLLABICS_BY_CODEPOINT.by_id
+}
+
+
+def _translate_syllabics(text: str) -> str:
+    return text.translate(_CANS_TO_SRO)
+
+
+_syllabics2sro = MemoizedConverter(_translate_syllabics)
+
+
+def syllabics2sro(text: str) -> str:
+    """
+    Converts syllabics into SRO. Anything that is not a Plains Cree syllabic
+    is left as-is.
+
+    >>> syllabics2sro("ᓀᐦᐃᔭᐍᐏᐣ")
+    'nêhiyawêwin'
+    """
+    return _syllabics2sro(text)
+
+
+def syllabics2sro_naive(text: str) -> str:
+    """
+    Same as syllabics2sro(), but with a plain Python loop. Only useful as a
+    point of comparison for benchmarks.
+    """
+    lookup = SYLLABICS_BY_CODEPOINT.get
+    result = []
+    for char in text:
+        record = lookup(ord(char))
+        result.append(char if record is None else record.sro)
+    return "".join(result)
+
+
+def syllabics2sro_stream(chunks: Iterable[str]) -> Iterator[str]:
+    """
+    Converts an iterable of syllabics text chunks into SRO chunks. Since the
+    mapping is per code point, chunks can be split anywhere.
+    """
+    for chunk in chunks:
+        yield _syllabics2sro(chunk)
+
+
+def read_text_chunks(
+    file: BinaryIO, chunk_size: int = DEFAULT_CHUNK_SIZE, counter: list = None
+) -> Iterator[str]:
+    """
+    Decodes a binary file as UTF-8, yielding text in chunks of about
+    chunk_size bytes. Multi-byte characters split between reads are handled
+    correctly.
+
+    If counter is given, counter[0] is incremented by the number of bytes
+    read.
+    """
+    decoder = codecs.getincrementaldecoder("UTF-8")()
+    while True:
+        data = file.read(chunk_size)
+        if counter is not None:
+            counter[0] += len(data)
+        text = decoder.decode(data, final=not data)
+        if text:
+            yield text
+        if not data:
+            return
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# Copyright © 2020 Eddie Antonio Santos <Eddie.Santos@nrc-cnrc.gc.ca>
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Estimates how fast an expert could type a corpus on an ASCII art LAYOUT.
+
+The time to move a finger from one key to the next is given by Fitts' law
+(in the Shannon formulation):
+
+    MT = a + b × log₂(D / W + 1)
+
+where D is the distance between the centres of the two keys, and W is the
+width of the target key (or its height, if that is smaller). Only the ratio
+D / W matters, so the physical size of a key (7 mm in [Park 2008]) does not.
+The default a and b are those measured for tapping on soft keyboards by
+[Soukoreff 1995].
+
+Each character is typed with its minimal tap sequence (see tap_cost.py),
+which includes the taps that switch layers: e.g., ᑲ is typed as k then a.
+Since every layer is drawn on the same grid, a tap is identified by the
+label of the key at the same place in LAYOUT, which does not change when
+keys are moved around. So the corpus is reduced to counts of pairs of
+consecutive labels once; estimating the speed of a layout is then a sum over
+those pairs, which is fast enough to evaluate thousands of candidates.
+
+[Park 2008]: https://www.sciencedirect.com/science/article/pii/S0169814109001036
+[Soukoreff 1995]: https://doi.org/10.1080/01449299508914633
+"""
+
+import math
+import os
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from operator import mul
+from typing import Dict, Iterable, List, NamedTuple, Sequence, Tuple
+
+from .syllabics import DEFAULT_DIALECT
+from .tap_cost import minimal_tap_sequences
+from .touch_layout import (
+    KEY_WIDTH,
+    LAYOUTS,
+    PADDING_BETWEEN,
+    SLOT_WIDTH,
+    create_keyman_touch_layout_json,
+    parse_ascii_layout,
+)
+
+__all__ = [
+    "SpeedEstimate",
+    "TapBigrams",
+    "count_tap_bigrams",
+    "estimate",
+    "estimate_many",
+    "key_geometry",
+    "label_sequences",
+    "read_layouts",
+]
+
+# Fitts' law constants for tapping on a soft keyboard, in seconds:
+FITTS_INTERCEPT = 0.083
+FITTS_SLOPE = 0.127
+# Roughly how long a key must be held before its long-press menu appears:
+LONG_PRESS_TIME = 0.5
+# By convention, a "word" is five characters (including spaces):
+CHARACTERS_PER_WORD = 5
+
+# (label, long_press) for each tap:
+LabelSequence = Tuple[Tuple[str, bool], ...]
+
+
+class TapBigrams(NamedTuple):
+    """
+    A corpus reduced to how often each label is tapped right after another.
+    """
+
+    # (previous label, next label), and how often that pair is tapped:
+    pairs: Tuple[Tuple[str, str], ...]
+    counts: Tuple[int, ...]
+    long_presses: int
+    # Characters typed, including the space after every word:
+    characters: int
+    # Characters that cannot be typed on the syllabic layers, and their
+    # frequencies (words with these characters are not counted):
+    untypeable: Dict[str, int]
+
+
+class SpeedEstimate(NamedTuple):
+    name: str
+    # Seconds it takes to type the whole corpus:
+    seconds: float
+    characters: int
+
+    @property
+    def wpm(self) -> float:
+        if not self.seconds:
+            return 0.0
+        return self.characters / CHARACTERS_PER_WORD / (self.seconds / 60)
+
+
+def label_sequences(
+    layout: str = None, dialect: str = DEFAULT_DIALECT
+) -> Dict[str, LabelSequence]:
+    """
+    Returns the labels (of keys in the layout) tapped to type each character.
+    Characters typed on the numeric layer are left out.
+    """
+    keyboard = parse_ascii_layout(layout or LAYOUTS[dialect], dialect)
+    touch_layout = create_keyman_touch_layout_json(keyboard, dialect=dialect)
+
+    # The syllabic layers have the same keys, in the same places, as the
+    # ASCII art. (The numeric and Latin layers do not.)
+    shape = [len(row) for row in keyboard]
+    label_at = {}
+    for layer in touch_layout["phone"]["layer"]:
+        if [len(row["key"]) for row in layer["row"]] != shape:
+            continue
+        for row, ascii_row in zip(layer["row"], keyboard):
+            for key, ascii_key in zip(row["key"], ascii_row):
+                for pressed in (key, *key.get("sk", ())):
+                    label_at.setdefault((layer["id"], pressed["id"]), ascii_key.label)
+
+    sequences = {}
+    for char, taps in minimal_tap_sequences(touch_layout).items():
+        if all((tap.layer, tap.key_id) in label_at for tap in taps):
+            sequences[char] = tuple(
+                (label_at[tap.layer, tap.key_id], tap.long_press) for tap in taps
+            )
+    return sequences
+
+
+def count_tap_bigrams(
+    word_frequencies: Dict[str, int], sequences: Dict[str, LabelSequence]
+) -> TapBigrams:
+    """
+    Counts consecutive taps of typing every word, followed by a space.
+    """
+    space = sequences.get(" ", (("SP", False),))
+    pairs = Counter()
+    long_presses = 0
+    characters = 0
+    untypeable = Counter()
+    for word, frequency in word_frequencies.items():
+        missing = [char for char in word if char not in sequences]
+        if missing:
+            untypeable.update({char: frequency for char in missing})
+            continue
+        # The previous word ended with a space:
+        taps = [*space]
+        for char in word:
+            taps.extend(sequences[char])
+        taps.extend(space)
+        for (previous, _), (label, long_press) in zip(taps, taps[1:]):
+            pairs[previous, label] += frequency
+            long_presses += long_press * frequency
+        characters += (len(word) + 1) * frequency
+
+    ordered = sorted(pairs)
+    return TapBigrams(
+        tuple(ordered),
+        tuple(pairs[pair] for pair in ordered),
+        long_presses,
+        characters,
+        dict(untypeable),
+    )
+
+
+def key_geometry(keyboard: Sequence[Sequence]) -> Dict[str, Tuple[float, float, float]]:
+    """
+    Returns the centre (x, y) and the target size of every key of a parsed
+    LAYOUT, laid out like the touch layout does, in Keyman units.
+    """
+    geometry = {}
+    for row_number, row in enumerate(keyboard):
+        x = 0.0
+        y = (row_number + 0.5) * SLOT_WIDTH
+        for key in row:
+            width = getattr(key, "effective_width", KEY_WIDTH)
+            if getattr(key, "proportional_width", 1) <= 1:
+                width = KEY_WIDTH
+            x += PADDING_BETWEEN
+            # The smaller of the width and height (keys are KEY_WIDTH high):
+            geometry[key.label] = (x + width / 2, y, min(width, KEY_WIDTH))
+            x += width
+    return geometry
+
+
+def movement_times(
+    geometry: Dict[str, Tuple[float, float, float]],
+    pairs: Iterable[Tuple[str, str]],
+    intercept: float = FITTS_INTERCEPT,
+    slope: float = FITTS_SLOPE,
+) -> List[float]:
+    """
+    Returns the Fitts' law movement time of each pair of labels.
+    """
+    log2, hypot = math.log2, math.hypot
+    times = []
+    for previous, label in pairs:
+        x1, y1, _ = geometry[previous]
+        x2, y2, size = geometry[label]
+        times.append(intercept + slope * log2(hypot(x2 - x1, y2 - y1) / size + 1))
+    return times
+
+
+def estimate(
+    name: str,
+    layout: str,
+    bigrams: TapBigrams,
+    dialect: str = DEFAULT_DIALECT,
+    intercept: float = FITTS_INTERCEPT,
+    slope: float = FITTS_SLOPE,
+) -> SpeedEstimate:
+    """
+    Estimates how long it takes to type the corpus on the layout.
+    """
+    geometry = key_geometry(parse_ascii_layout(layout, dialect))
+    missing = {label for pair in bigrams.pairs for label in pair} - geometry.keys()
+    if missing:
+        raise ValueError(f"{name} has no key for {', '.join(sorted(missing))}")
+    times = movement_times(geometry, bigrams.pairs, intercept, slope)
+    seconds = sum(map(mul, bigrams.counts, times))
+    seconds += bigrams.long_presses * LONG_PRESS_TIME
+    return SpeedEstimate(name, seconds, bigrams.characters)
+
+
+def _estimate_chunk(arguments) -> List[SpeedEstimate]:
+    layouts, bigrams, dialect, intercept, slope = arguments
+    return [
+        estimate(name, layout, bigrams, dialect, intercept, slope)
+        for name, layout in layouts
+    ]
+
+
+def estimate_many(
+    layouts: Sequence[Tuple[str, str]],
+    bigrams: TapBigrams,
+    dialect: str = DEFAULT_DIALECT,
+    intercept: float = FITTS_INTERCEPT,
+    slope: float = FITTS_SLOPE,
+    jobs: int = None,
+) -> List[SpeedEstimate]:
+    """
+    Estimates the speed of many (name, layout) pairs, on several processes,
+    in the order given.
+    """
+    jobs = min(jobs or os.cpu_count() or 1, len(layouts)) or 1
+    size = math.ceil(len(layouts) / jobs)
+    work = [
+        (layouts[start : start + size], bigrams, dialect, intercept, slope)
+        for start in range(0, len(layouts), size)
+    ]
+    if jobs == 1:
+        chunks = list(map(_estimate_chunk, work))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            chunks = list(executor.map(_estimate_chunk, work))
+    return [result for chunk in chunks for result in chunk]
+
+
+def read_layouts(name: str, text: str) -> List[Tuple[str, str]]:
+    """
+    Reads the LAYOUTs in a file, as printed by optimize-layout.py: separated
+    by blank lines, and perhaps preceded by "# cost:" comments. If there is
+    more than one, each is named by its position, e.g., "candidates.txt#2".
+    """
+    layouts = []
+    for block in re.split(r"\n\s*\n", text):
+        lines = [
+            line
+            for line in block.split("\n")
+            if line.strip() and not line.lstrip().startswith("#")
+        ]
+        if lines:
+            layouts.append("\n".join(lines))
+    if len(layouts) == 1:
+        return [(name, layouts[0])]
+    return [(f"{name}#{number}", layout) for number, layout in enumerate(layouts, 1)]
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# Copyright © 2020 Eddie Antonio Santos <Eddie.Santos@nrc-cnrc.gc.ca>
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Checks a generated touch layout and its .kmn rules for completeness.
+
+The keyboard is treated as a graph: layers are nodes, and every key's
+nextlayer (and the layer() of every rule that key triggers, once the rule's
+context can be typed) is an edge. validate() reports:
+
+ - layers that cannot be reached from the default layer, and keys or rules
+   that switch to layers that do not exist;
+ - syllabics of the dialect that cannot be typed;
+ - backspace rules that lead to a layer on which the deleted syllabic
+   cannot be typed again;
+ - holes (blank keys) anywhere other than where a syllabic does not exist
+   (e.g., nwi, in the nwV layer).
+"""
+
+import json
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Set, Tuple
+
+from .rule_engine import Rule, default_output, parse_kmn
+from .syllabics import DEFAULT_DIALECT, syllabics_for
+from .touch_layout import BLANK_KEY
+
+__all__ = ["Problem", "validate", "validate_files"]
+
+DEFAULT_LAYER = "default"
+
+
+class Problem(NamedTuple):
+    """
+    Something wrong with the keyboard.
+    """
+
+    # One of "missing layer", "unreachable", "untypable", "backspace", "hole"
+    check: str
+    message: str
+
+    def __str__(self) -> str:
+        return f"{self.check}: {self.message}"
+
+
+def validate_files(
+    kmn_filename: str, layout_filename: str, dialect: str = DEFAULT_DIALECT
+) -> List[Problem]:
+    with open(kmn_filename, encoding="UTF-8") as kmn_file:
+        rules = parse_kmn(kmn_file.read())
+    with open(layout_filename, encoding="UTF-8") as layout_file:
+        touch_layout = json.load(layout_file)
+    return validate(touch_layout, rules, dialect)
+
+
+def validate(
+    touch_layout: dict, rules: Iterable[Rule], dialect: str = DEFAULT_DIALECT
+) -> List[Problem]:
+    """
+    Returns every problem found with the keyboard (an empty list if it is
+    complete).
+    """
+    layers = touch_layout["phone"]["layer"]
+    keys_by_layer = {layer["id"]: list(_pressable_keys(layer)) for layer in layers}
+    rules_by_key: Dict[str, List[Rule]] = defaultdict(list)
+    for rule in rules:
+        rules_by_key[rule.key].append(rule)
+
+    problems = list(_check_targets(keys_by_layer, rules_by_key))
+    reachable, typable = _explore(keys_by_layer, rules_by_key)
+    for layer_id in keys_by_layer:
+        if layer_id not in reachable:
+            problems.append(
+                Problem("unreachable", f"{layer_id} cannot be reached from default")
+            )
+
+    syllabics = syllabics_for(dialect)
+    for syllabic in syllabics.values():
+        if syllabic.cans not in typable:
+            problems.append(
+                Problem("untypable", f"{syllabic} ({syllabic.sro}) cannot be typed")
+            )
+
+    problems.extend(_check_backspace(keys_by_layer, rules_by_key.get("K_BKSP", ())))
+    problems.extend(_check_holes(layers, syllabics))
+    return problems
+
+
+def _pressable_keys(layer: dict) -> Iterator[dict]:
+    """
+    Yields every key and long-press key of a layer, with the nextlayer that
+    pressing it would switch to.
+    """
+    for row in layer["row"]:
+        for key in row["key"]:
+            if not key.get("id"):
+                continue
+            yield key
+            for subkey in key.get("sk", ()):
+                if "nextlayer" in key and "nextlayer" not in subkey:
+                    subkey = {**subkey, "nextlayer": key["nextlayer"]}
+                yield subkey
+
+
+def _check_targets(keys_by_layer, rules_by_key) -> Iterator[Problem]:
+    """
+    Every layer that a key or rule switches to must exist.
+    """
+    reported = set()
+    for layer_id, keys in keys_by_layer.items():
+        for key in keys:
+            targets = [(key.get("nextlayer"), f"key {key['id']} on {layer_id}")]
+            for rule in rules_by_key.get(key["id"], ()):
+                targets.append((rule.layer, f"a rule for {key['id']}"))
+            for target, source in targets:
+                if target is None or target in keys_by_layer:
+                    continue
+                if (target, source) not in reported:
+                    reported.add((target, source))
+                    yield Problem("missing layer", f"{source} switches to {target}")
+
+
+def _explore(keys_by_layer, rules_by_key) -> Tuple[List[str], Set[str]]:
+    """
+    Returns the layers that can be reached from the default layer, and every
+    character that can be typed.
+
+    Pressing a key on a reachable layer types its output and switches to its
+    nextlayer. A rule triggered by the key does too, but only once its
+    context can be typed; so the layers and the characters are explored
+    together, until neither grows.
+    """
+    if DEFAULT_LAYER not in keys_by_layer:
+        return [], set()
+    reachable = {DEFAULT_LAYER: None}
+    typable = set()
+    fired = set()
+    changed = True
+    while changed:
+        changed = False
+        for layer_id in list(reachable):
+            for key in keys_by_layer[layer_id]:
+                targets = [key.get("nextlayer")]
+                output = default_output(key)
+                if output and output not in typable:
+                    typable.update(output)
+                    changed = True
+                for rule in rules_by_key.get(key["id"], ()):
+                    if rule in fired or not all(
+                        typable.intersection(position) for position in rule.context
+                    ):
+                        continue
+                    fired.add(rule)
+                    typable.update(rule.output)
+                    targets.append(rule.layer)
+                    changed = True
+                for target in targets:
+                    if target in keys_by_layer and target not in reachable:
+                        reachable[target] = None
+                        changed = True
+    return list(reachable), typable
+
+
+def _check_backspace(keys_by_layer, backspace_rules) -> Iterator[Problem]:
+    """
+    Backspace breaks a syllabic apart, and switches to the layer from which
+    the syllabic can be typed again.
+    """
+    for rule in backspace_rules:
+        if rule.layer is None or not rule.context:
+            continue
+        deleted = set(rule.context[-1])
+        keys = keys_by_layer.get(rule.layer)
+        if keys is None:
+            # Already reported as a missing layer.
+            continue
+        retypable = {default_output(key) for key in keys}
+        lost = "".join(sorted(deleted - retypable))
+        if lost:
+            yield Problem(
+                "backspace",
+                f"after deleting {lost} and switching to {rule.layer}, "
+                "it cannot be typed again",
+            )
+
+
+def _check_holes(layers, syllabics) -> Iterator[Problem]:
+    """
+    A hole is only expected where the default layer has a vowel, but the
+    syllabic of that vowel on the current layer (e.g., nwi) does not exist.
+    """
+    by_id = {layer["id"]: layer for layer in layers}
+    default = by_id.get(DEFAULT_LAYER)
+    if default is None:
+        return
+    vowels = {s.cans: s.sro for s in syllabics.values() if s.type == "vowel"}
+
+    for layer in layers:
+        for row_number, row in enumerate(layer["row"]):
+            for column, key in enumerate(row["key"]):
+                if key.get("id") and key.get("sp") != BLANK_KEY:
+                    continue
+                where = f"{layer['id']}, row {row_number + 1}, key {column + 1}"
+                try:
+                    text = default["row"][row_number]["key"][column]["text"]
+                except (IndexError, KeyError):
+                    text = None
+                if text not in vowels or not layer["id"].endswith("V"):
+                    yield Problem("hole", f"unexpected blank key at {where}")
+                    continue
+                sro = layer["id"][:-1] + vowels[text]
+                if sro in syllabics:
+                    yield Problem(
+                        "hole", f"{syllabics[sro]} ({sro}) is missing at {where}"
+                    )
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# Copyright © 2020 Eddie Antonio Santos <Eddie.Santos@nrc-cnrc.gc.ca>
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Searches for alternative placements of the keys in LAYOUT (from
+generate-touch-layout.py) using simulated annealing on every core.
+
+The best candidates are printed as LAYOUT strings, separated by blank lines
+and each preceded by a "# cost:" comment.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from libkeyboard.ioutils import setup_output
+from libkeyboard.layout_optimizer import LayoutProblem, optimize
+from libkeyboard.syllabics import SYLLABICS
+from libkeyboard.touch_layout import LAYOUT, parse_ascii_layout
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("unigrams", help="TSV of key labels and their frequencies")
+parser.add_argument(
+    "comfort",
+    help="comfort score of every key position, one row of the layout per line",
+)
+parser.add_argument(
+    "--bigrams", help="TSV of pairs of key labels (first, second, frequency)"
+)
+parser.add_argument(
+    "--travel-weight",
+    type=float,
+    default=0.1,
+    help="importance of travel between keys relative to comfort (default: 0.1)",
+)
+parser.add_argument("--layout", help="a file containing a LAYOUT to start from")
+parser.add_argument("--chains", type=int, help="independent chains (default: jobs)")
+parser.add_argument("--jobs", type=int, help="worker processes (default: all CPUs)")
+parser.add_argument("--steps", type=int, default=200_000, help="steps per chain")
+parser.add_argument("--seed", type=int, default=0)
+parser.add_argument("--top", type=int, default=3, help="candidates to print")
+
+
+def read_rows(filename):
+    with open(filename, encoding="UTF-8") as tsv_file:
+        for line in tsv_file:
+            if line.strip() and not line.startswith("#"):
+                yield line.rstrip("\n").split("\t")
+
+
+def number(text):
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def main():
+    args = parser.parse_args()
+
+    # The touch layout is the source of truth for LAYOUT and how it is parsed.
+    if args.layout:
+        layout = Path(args.layout).read_text(encoding="UTF-8")
+    else:
+        layout = LAYOUT
+    keyboard = parse_ascii_layout(layout)
+
+    unigrams = {
+        row[0]: number(row[-1]) for row in read_rows(args.unigrams) if number(row[-1])
+    }
+    bigrams = {}
+    if args.bigrams:
+        for row in read_rows(args.bigrams):
+            if len(row) == 3 and number(row[2]):
+                bigrams[row[0], row[1]] = number(row[2])
+    with open(args.comfort, encoding="UTF-8") as comfort_file:
+        comfort = [
+            [float(score) for score in line.split()]
+            for line in comfort_file
+            if line.strip() and not line.startswith("#")
+        ]
+
+    keys = [key for row in keyboard for key in row]
+    problem = LayoutProblem(
+        layout,
+        movable=[key.label for key in keys if key.label in SYLLABICS],
+        unigrams=unigrams,
+        comfort=comfort,
+        bigrams=bigrams,
+        widths=[
+            [getattr(key, "proportional_width", 1) for key in row] for row in keyboard
+        ],
+        travel_weight=args.travel_weight,
+    )
+
+    initial_cost = problem.cost(list(range(len(problem.initial))))
+    print(f"cost of the current layout: {initial_cost:.6f}", file=sys.stderr)
+
+    candidates = optimize(problem, args.chains, args.steps, args.seed, args.jobs)
+
+    setup_output(None)
+    for candidate in candidates[: args.top]:
+        rendered = problem.render(candidate.labels)
+        # Make sure the generator will accept what we print:
+        reparsed = parse_ascii_layout(rendered)
+        assert sorted(key.label for row in reparsed for key in row) == sorted(
+            key.label for row in keyboard for key in row
+        )
+        print(f"# cost: {candidate.cost:.6f}")
+        print(rendered)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# Copyright © 2020 Eddie Antonio Santos <Eddie.Santos@nrc-cnrc.gc.ca>
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Draws every layer of the touch layout as an SVG image, e.g.,
+
+    OUTDIR/layout-default.svg
+    OUTDIR/layout-kV.svg
+
+By default, the touch layout is generated (like generate-touch-layout.py
+does); give --touch-layout to draw an existing .keyman-touch-layout file
+instead. Only layers that changed since the last run are drawn again.
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from libkeyboard.layer_renderer import render_layers
+from libkeyboard.syllabics import DEFAULT_DIALECT, DIALECTS
+from libkeyboard.touch_layout import create_touch_layout
+
+parser = argparse.ArgumentParser(
+    description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+)
+parser.add_argument("outdir", help="where to write the images")
+parser.add_argument("--with-latin", action="store_true", dest="latin", default=False)
+parser.add_argument("--without-latin", action="store_false", dest="latin")
+parser.add_argument(
+    "--dialect",
+    choices=DIALECTS,
+    default=DEFAULT_DIALECT,
+    help="which dialect's syllabics and layout to use (default: %(default)s)",
+)
+parser.add_argument(
+    "--touch-layout",
+    metavar="FILE",
+    help="draw the layers of this .keyman-touch-layout file",
+)
+parser.add_argument(
+    "-j",
+    "--jobs",
+    type=int,
+    default=0,
+    help="how many processes to draw layers on (default: one per CPU)",
+)
+parser.add_argument(
+    "--force",
+    action="store_true",
+    help="draw every layer, even if its image is up to date",
+)
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    start = time.perf_counter()
+    if args.touch_layout:
+        with open(args.touch_layout, encoding="UTF-8") as layout_file:
+            touch_layout = json.load(layout_file)
+    else:
+        touch_layout = create_touch_layout(args.latin, dialect=args.dialect)
+
+    results = render_layers(
+        touch_layout, args.outdir, jobs=args.jobs or None, force=args.force
+    )
+    rendered = sum(result.rendered for result in results)
+    print(
+        f"drew {rendered} of {len(results)} layers "
+        f"in {time.perf_counter() - start:.3f} s",
+        file=sys.stderr,
+    )
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# Copyright © 2020 Eddie Antonio Santos <Eddie.Santos@nrc-cnrc.gc.ca>
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Replays keystrokes against the generated keyboard, without a phone.
+
+Each line of input is a whitespace-separated sequence of keys, typed from
+scratch on the default layer. Keys are named either by id (U_1420, K_BKSP)
+or by the label on the key (ᐠ, *BkSp*). The text typed by each line is
+printed.
+
+If a line contains a tab, whatever follows the tab is the text that the
+keystrokes are expected to produce. Any mismatches are reported and the
+exit status is non-zero, so this can be used as a regression test.
+"""
+
+import argparse
+import sys
+import time
+
+from libkeyboard.ioutils import setup_output
+from libkeyboard.rule_engine import Keyboard
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("kmn", help="the .kmn file")
+parser.add_argument("touch_layout", help="the .keyman-touch-layout file")
+parser.add_argument("keys", nargs="?", help="keystrokes (default: stdin)")
+
+
+def main():
+    args = parser.parse_args()
+
+    keyboard = Keyboard.from_files(args.kmn, args.touch_layout)
+    if args.keys in (None, "-"):
+        sys.stdin.reconfigure(encoding="UTF-8")
+        lines = sys.stdin
+    else:
+        lines = open(args.keys, encoding="UTF-8")
+    setup_output(None)
+
+    failures = 0
+    key_count = 0
+    start = time.perf_counter()
+    with lines:
+        for lineno, line in enumerate(lines, start=1):
+            keystrokes, has_expectation, expected = line.rstrip("\n").partition("\t")
+            keys = keystrokes.split()
+            key_count += len(keys)
+            try:
+                text, _layer = keyboard.replay(keys)
+            except KeyError as error:
+                print(f"line {lineno}: {error.args[0]}", file=sys.stderr)
+                failures += 1
+                continue
+            if has_expectation and text != expected:
+                print(
+                    f"line {lineno}: expected {expected!r}, got {text!r}",
+                    file=sys.stderr,
+                )
+                failures += 1
+            print(text)
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"{key_count} keys in {elapsed:.3f} s "
+        f"({key_count / max(elapsed, 1e-9):,.0f} keys/s); {failures} failure(s)",
+        file=sys.stderr,
+    )
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# Copyright © 2020 Eddie Antonio Santos <Eddie.Santos@nrc-cnrc.gc.ca>
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Serves customized .kmn and .keyman-touch-layout files over HTTP, e.g.,
+
+    curl 'http://localhost:8000/nrc_crk_cans.kmn?vowel-hack=yes'
+    curl --data-binary @layout.txt \\
+        'http://localhost:8000/nrc_crk_cans.keyman-touch-layout?latin=no'
+    curl http://localhost:8000/stats
+"""
+
+import argparse
+import asyncio
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from libkeyboard.service import KeyboardService
+
+parser = argparse.ArgumentParser(
+    description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+)
+parser.add_argument("--host", default="127.0.0.1", help="default: %(default)s")
+parser.add_argument("--port", type=int, default=8000, help="default: %(default)s")
+parser.add_argument(
+    "--cache-size",
+    type=int,
+    default=128,
+    help="how many generated files to keep in memory (default: %(default)s)",
+)
+parser.add_argument(
+    "-j",
+    "--jobs",
+    type=int,
+    default=0,
+    help="how many processes to generate files on (default: one per CPU)",
+)
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    with ProcessPoolExecutor(max_workers=args.jobs or None) as executor:
+        service = KeyboardService(cache_size=args.cache_size, executor=executor)
+        print(f"Serving on http://{args.host}:{args.port}/", file=sys.stderr)
+        try:
+            asyncio.run(service.serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
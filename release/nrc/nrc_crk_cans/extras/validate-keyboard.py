@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# Copyright © 2020 Eddie Antonio Santos <Eddie.Santos@nrc-cnrc.gc.ca>
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Checks that every layer of the keyboard can be reached, that every syllabic
+can be typed, that backspace always leads to a valid layer, and that the
+only blank keys are where a syllabic does not exist.
+
+Problems are printed, and the exit status is non-zero if there are any.
+"""
+
+import argparse
+import sys
+import time
+
+from libkeyboard.syllabics import DEFAULT_DIALECT, DIALECTS
+from libkeyboard.validator import validate_files
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("kmn", help="the .kmn file")
+parser.add_argument("touch_layout", help="the .keyman-touch-layout file")
+parser.add_argument(
+    "--dialect",
+    choices=DIALECTS,
+    default=DEFAULT_DIALECT,
+    help="the dialect the keyboard was generated for (default: %(default)s)",
+)
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    start = time.perf_counter()
+    problems = validate_files(args.kmn, args.touch_layout, args.dialect)
+    elapsed = time.perf_counter() - start
+
+    for problem in problems:
+        print(problem)
+    print(
+        f"{len(problems)} problem(s) found in {elapsed * 1000:.1f} ms",
+        file=sys.stderr,
+    )
+    sys.exit(1 if problems else 0)